@@ -1,20 +1,33 @@
 # backend/main.py
 import os
 import uuid
+import hashlib
+import random
 import shutil
-from typing import List, Optional
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import threading
+import time
+from typing import Iterator, List, Optional
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from pathlib import Path
 import json
 
-from app.utils.extractor import extract_text_from_file
-from app.utils.chunker import chunk_text
-from app.utils.embedder import EmbeddingIndex
+from app.utils.extractor import iter_pages
+from app.utils.batcher import batcher_stats
+from app.utils.cache import LRUCache
+from app.utils.ann import load_faiss_layout, save_faiss_layout
+from app.utils.chunker import PAGE_SEP, ChunkTable, iter_chunk_spans
+from app.utils.embedder import QUERY_EMBEDDING_CACHE, EmbeddingIndex
+from app.utils.genclient import GEN_CLIENT
+from app.utils.ingest_cache import IngestCache
+from app.utils.jobs import Job, JobStore
+from app.utils.model_registry import DEFAULT_MODEL, model_stats, warmup
 from app.utils.generation import summarize_textrank
-from app.utils.vectorstore import answer_question_from_context
-from app.utils.quizmaker import generate_quiz_from_text
+from app.utils.vectorstore import answer_cache_stats, answer_question_from_context, stream_answer_from_context
+from app.utils.quizmaker import QuizBank, iter_quiz_incremental
+from app.utils.uploads import UploadTooLarge, receive_file
 import nltk
 nltk.data.path.append(r"C:\Users\peaky\AppData\Roaming\nltk_data")
 
@@ -34,19 +47,132 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# uploads are parsed and written to disk as they arrive; anything above the limit is rejected
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 256 * 1024 * 1024))
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    # a declared Content-Length over the limit is refused before any of the body is read;
+    # bodies without one (chunked) are cut off by receive_file once they pass the limit
+    if request.url.path == "/upload":
+        length = request.headers.get("content-length")
+        if length and length.isdigit() and int(length) > MAX_UPLOAD_BYTES:
+            return JSONResponse(status_code=413, content={"detail": f"File too large (max {MAX_UPLOAD_BYTES} bytes)."})
+    return await call_next(request)
+
+# models to load once at startup (comma separated), so the first upload doesn't pay for it
+WARMUP_MODELS = [m for m in os.environ.get("WARMUP_MODELS", DEFAULT_MODEL).split(",") if m]
+
+@app.on_event("startup")
+def load_models():
+    warmup(WARMUP_MODELS)
+
+@app.on_event("shutdown")
+async def close_generation_client():
+    await GEN_CLIENT.aclose()
+
 # persistent index and doc store (in-memory for runtime, on-disk for reload)
-INDEX_PATH = DATA_DIR / "index.npz"
+# (a directory rather than .npz: arrays inside a zip archive cannot be memory-mapped)
+INDEX_PATH = DATA_DIR / "index"
 DOC_META_PATH = DATA_DIR / "doc_meta.json"
+# with a FAISS backend (INDEX_BACKEND=flat|ivf|hnsw) the ANN index is also kept in this layout
+FAISS_INDEX_PATH = Path("faiss_index.index")
+FAISS_META_PATH = Path("faiss_metadata.pkl")
+
+# pipeline parameters; together with the file hash they key the ingest cache
+CHUNK_SIZE = 600
+CHUNK_OVERLAP = 80
+SUMMARY_SENTENCES = 8
+
+# summaries are computed off the upload path and stored per (document hash, sentences_count)
+SUMMARY_DIR = DATA_DIR / "summaries"
+SUMMARY_DIR.mkdir(exist_ok=True)
+SUMMARY_PENDING = set()
+SUMMARY_LOCK = threading.Lock()
+# failed summaries are retried with exponential backoff instead of on every poll:
+# (doc hash, sentences_count) -> {"failures", "retry_at", "error"}
+SUMMARY_FAILURES = {}
+SUMMARY_RETRY_BASE = float(os.environ.get("SUMMARY_RETRY_BASE", 10))
+SUMMARY_RETRY_MAX = float(os.environ.get("SUMMARY_RETRY_MAX", 600))
+# summary files kept on disk, least recently used removed first
+SUMMARY_MAX_FILES = int(os.environ.get("SUMMARY_MAX_FILES", 500))
+
+# processed uploads keyed on content hash, so identical re-uploads skip the pipeline
+INGEST_CACHE = IngestCache(
+    DATA_DIR / "cache",
+    max_bytes=int(os.environ.get("INGEST_CACHE_MAX_BYTES", 1 << 30)),
+)
+
+# ingest jobs run here so /upload returns at once and /query stays responsive
+JOBS = JobStore(max_workers=int(os.environ.get("INGEST_WORKERS", 2)))
+# follow-up work on a published document (summary, quiz bank) has its own workers, so a new
+# upload never queues behind jobs for a document that has since been replaced
+BACKGROUND_JOBS = JobStore(max_workers=int(os.environ.get("BACKGROUND_WORKERS", 2)))
+# only the most recent upload may replace CURRENT and the on-disk index; older jobs still
+# running when a newer file arrives finish as "superseded". Files of unfinished jobs are
+# kept until the job is done with them.
+UPLOAD_LOCK = threading.Lock()
+LATEST_UPLOAD = {"file_id": None}
+ACTIVE_UPLOADS = set()  # paths still being read by an ingest job
+PUBLISH_LOCK = threading.Lock()  # INDEX_PATH, DOC_META_PATH, FAISS_* and CURRENT
 
 # Global in-memory holder for current file
 CURRENT = {
     "file_id": None,
     "filename": None,
+    "doc_hash": None,  # sha256 of the uploaded file
     "text": None,
     "chunks": None,
-    "summary": None,
-    "index": None  # EmbeddingIndex instance
+    "index": None,  # EmbeddingIndex instance
+    "quiz_bank": None,  # QuizBank, built once per document
+    "window_quizzes": set()  # (num_questions, seed) of quizzes served before the bank was built
 }
+QUIZ_BANK_LOCK = threading.Lock()
+# quizzes served from tagged windows per document; beyond this many, requests wait for the bank
+WINDOW_QUIZ_LOCK = threading.Lock()
+WINDOW_QUIZZES_MAX = int(os.environ.get("WINDOW_QUIZZES_MAX", 10000))
+# generated quizzes keyed on (document hash, num_questions, seed)
+QUIZ_CACHE = LRUCache(maxsize=int(os.environ.get("QUIZ_CACHE_SIZE", 512)))
+
+@app.on_event("startup")
+def restore_current():
+    """
+    Warm restart: reload the last processed document from DATA_DIR. The embedding
+    matrix is memory-mapped, so this takes milliseconds regardless of its size.
+    """
+    if not DOC_META_PATH.exists():
+        return
+    try:
+        with open(DOC_META_PATH, encoding="utf-8") as f:
+            meta = json.load(f)
+        emb_index = EmbeddingIndex.load(INDEX_PATH, mmap=True)
+        if emb_index is None or not isinstance(emb_index.texts, ChunkTable):
+            return
+    except Exception:
+        # a stale or partial data dir just means starting without a document
+        return
+    if emb_index.backend != "numpy":
+        # reuse the saved ANN index if it belongs to this document, else rebuild lazily
+        # (a missing faiss install or unreadable index file must not drop the document)
+        try:
+            loaded = load_faiss_layout(FAISS_INDEX_PATH, FAISS_META_PATH)
+            if loaded:
+                ann, faiss_meta = loaded
+                if len(ann) == len(emb_index.embeddings) and faiss_meta and faiss_meta[0].get("file_id") == meta.get("file_id"):
+                    emb_index.ann = ann
+        except Exception:
+            emb_index.ann = None
+    CURRENT.update({
+        "file_id": meta.get("file_id"),
+        "filename": meta.get("filename"),
+        "doc_hash": meta.get("doc_hash", meta.get("file_id")),
+        "text": emb_index.texts.text,
+        "chunks": emb_index.texts,
+        "index": emb_index,
+        "quiz_bank": None,
+        "window_quizzes": set()
+    })
+    _request_summary(CURRENT["doc_hash"], CURRENT["text"], SUMMARY_SENTENCES)
 
 # Helper models
 class QueryRequest(BaseModel):
@@ -55,101 +181,412 @@ class QueryRequest(BaseModel):
 
 class QuizRequest(BaseModel):
     num_questions: int = 5
+    seed: Optional[int] = None  # same seed + document -> same quiz
 
 @app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(request: Request):
     """
-    Upload a single file. If a previous file exists, it will be cleared.
-    Automatic processing includes: text extraction, chunking, embedding, summary.
+    Upload a single file (multipart form field "file"). If a previous file exists,
+    it will be cleared. The file is saved and a background job is started for text
+    extraction, chunking, embedding and summary; poll /jobs/{job_id} for progress.
     """
-    # clear old uploads
-    for p in UPLOAD_DIR.glob("*"):
-        try:
-            p.unlink()
-        except Exception:
-            if p.is_dir():
-                shutil.rmtree(p)
-
     file_id = str(uuid.uuid4())
-    filename = f"{file_id}_{file.filename}"
-    dest = UPLOAD_DIR / filename
-    with open(dest, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    part = UPLOAD_DIR / f"{file_id}.part"
+    with UPLOAD_LOCK:
+        # clear old uploads, except files an unfinished job is still reading
+        for p in UPLOAD_DIR.glob("*"):
+            if p in ACTIVE_UPLOADS:
+                continue
+            try:
+                p.unlink()
+            except Exception:
+                if p.is_dir():
+                    shutil.rmtree(p)
+        ACTIVE_UPLOADS.add(part)
+    # the body is parsed as it arrives: written and hashed in one pass, never spooled
+    try:
+        filename, file_hash, _ = await receive_file(request.stream(), request.headers.get("content-type"),
+                                                    part, MAX_UPLOAD_BYTES)
+    except UploadTooLarge:
+        _release_upload(part)
+        raise HTTPException(status_code=413, detail=f"File too large (max {MAX_UPLOAD_BYTES} bytes).")
+    except ValueError as e:
+        _release_upload(part)
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        _release_upload(part)
+        raise
 
-    # extract text
+    dest = UPLOAD_DIR / f"{file_id}_{filename}"
+    # only a completely received file supersedes the jobs already running
+    with UPLOAD_LOCK:
+        part.replace(dest)
+        ACTIVE_UPLOADS.discard(part)
+        ACTIVE_UPLOADS.add(dest)
+        LATEST_UPLOAD["file_id"] = file_id
+    job_id = JOBS.submit(_process_upload, dest, file_hash, file_id, filename)
+    return {"status": "queued", "job_id": job_id, "file_id": file_id, "filename": filename}
+
+def _release_upload(dest: Path):
+    with UPLOAD_LOCK:
+        ACTIVE_UPLOADS.discard(dest)
+        dest.unlink(missing_ok=True)
+
+def _is_latest(file_id: str) -> bool:
+    with UPLOAD_LOCK:
+        return LATEST_UPLOAD["file_id"] == file_id
+
+def _process_upload(job: Job, dest: Path, file_hash: str, file_id: str, original_name: str) -> dict:
+    """Ingest pipeline, run on the job pool. Replaces CURRENT once the document is ready."""
     try:
-        raw_text = extract_text_from_file(dest)
-        if not raw_text or len(raw_text.strip()) == 0:
-            raise HTTPException(status_code=400, detail="No text found in file.")
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to extract text: {e}")
+        return _ingest(job, dest, file_hash, file_id, original_name)
+    finally:
+        # the index holds the text now; the uploaded file is no longer needed
+        _release_upload(dest)
 
-    # chunk text (for retrieval)
-    chunks = chunk_text(raw_text, chunk_size=600, overlap=80)
+def _superseded(job: Job, file_id: str, original_name: str) -> dict:
+    job.update("superseded")
+    return {"status": "superseded", "file_id": file_id, "filename": original_name}
 
-    # build embeddings index (uses sentence-transformers small model CPU)
-    emb_index = EmbeddingIndex()
-    emb_index.add_texts(chunks)
+def _ingest(job: Job, dest: Path, file_hash: str, file_id: str, original_name: str) -> dict:
+    if not _is_latest(file_id):
+        return _superseded(job, file_id, original_name)
+    cache_key = IngestCache.make_key(
+        file_hash,
+        chunk_size=CHUNK_SIZE,
+        overlap=CHUNK_OVERLAP,
+        model_name=DEFAULT_MODEL,
+    )
+    cached = INGEST_CACHE.get(cache_key)
+    if cached:
+        raw_text = cached["text"]
+        emb_index = cached["index"]
+        chunks = emb_index.texts
+    else:
+        # extract -> chunk -> embed as one stream: embedding batches start while
+        # later pages are still being extracted. Chunks are kept as spans into the
+        # document text rather than as separate strings.
+        job.update("extracting")
+        page_texts = []
+        chunks = ChunkTable()
 
-    # summarize (Textrank extractive)
-    summary_points = summarize_textrank(raw_text, sentences_count=8)
+        def pages():
+            try:
+                for page_no, txt in iter_pages(dest, progress=job.progress("extracting")):
+                    if txt:
+                        page_texts.append(txt)
+                        yield page_no, txt
+            except Exception as e:
+                raise RuntimeError(f"Failed to extract text: {e}")
 
-    # persist basic meta (optional minimal on-disk)
-    meta = {
-        "file_id": file_id,
-        "filename": file.filename,
-        "num_chunks": len(chunks)
-    }
-    with open(DOC_META_PATH, "w", encoding="utf-8") as f:
-        json.dump(meta, f, indent=2)
+        def chunk_stream():
+            for start, end, page, chunk in iter_chunk_spans(pages(), chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+                chunks.append(start, end, page)
+                yield chunk
 
-    # store in global
-    CURRENT.update({
-        "file_id": file_id,
-        "filename": file.filename,
-        "text": raw_text,
-        "chunks": chunks,
-        "summary": summary_points,
-        "index": emb_index
-    })
+        emb_index = EmbeddingIndex(DEFAULT_MODEL)
+        emb_index.add_stream(chunk_stream(), progress=job.progress("embedding"), keep_texts=False)
+        if not len(chunks):
+            raise RuntimeError("No text found in file.")
+        raw_text = PAGE_SEP.join(page_texts)
+        del page_texts
+        chunks.text = raw_text
+        emb_index.texts = chunks
+
+        INGEST_CACHE.put(cache_key, emb_index)
+
+    if emb_index.backend != "numpy":
+        # build the ANN index here rather than on the first query
+        job.update("indexing")
+        emb_index.ensure_ann()
+
+    # persisting and publishing is serialized, and skipped if a newer upload arrived
+    # meanwhile, so an older job finishing last cannot overwrite the newer document
+    with PUBLISH_LOCK:
+        if not _is_latest(file_id):
+            return _superseded(job, file_id, original_name)
+        if emb_index.backend != "numpy":
+            faiss_meta = [
+                {"file_id": file_id, "filename": original_name, "page": chunks.span(i)["page"], "chunk_index": i, "text": chunks[i]}
+                for i in range(len(chunks))
+            ]
+            save_faiss_layout(emb_index.ensure_ann(), faiss_meta, FAISS_INDEX_PATH, FAISS_META_PATH)
+
+        # persist index, text and meta so a restart can restore CURRENT without re-processing
+        job.update("saving")
+        emb_index.save(INDEX_PATH)
+        meta = {
+            "file_id": file_id,
+            "filename": original_name,
+            "doc_hash": file_hash,
+            "num_chunks": len(chunks)
+        }
+        with open(DOC_META_PATH, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
 
-    return {"status": "ok", "file_id": file_id, "filename": file.filename, "summary_points": summary_points}
+        # store in global
+        CURRENT.update({
+            "file_id": file_id,
+            "filename": original_name,
+            "doc_hash": file_hash,
+            "text": raw_text,
+            "chunks": chunks,
+            "index": emb_index,
+            "quiz_bank": None,
+            "window_quizzes": set()
+        })
+    # retrieval is usable now; the summary (TextRank) and the quiz bank are built
+    # in the background. summary_points is None until /summary reports it ready.
+    summary_points = _request_summary(file_hash, raw_text, SUMMARY_SENTENCES)
+    BACKGROUND_JOBS.submit(_build_quiz_bank, file_id)
+    job.update("done")
+
+    return {"status": "ok", "file_id": file_id, "filename": original_name, "summary_points": summary_points,
+            "summary_status": "ready" if summary_points is not None else "pending", "cached": bool(cached)}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id.")
+    return job.to_dict()
+
+def _summary_path(doc_hash: str, sentences_count: int) -> Path:
+    return SUMMARY_DIR / f"{doc_hash}_{sentences_count}.json"
+
+def _load_summary(doc_hash: str, sentences_count: int, touch: bool = False) -> Optional[List[str]]:
+    path = _summary_path(doc_hash, sentences_count)
+    try:
+        with open(path, encoding="utf-8") as f:
+            summary = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if touch:
+        # mtime is the recency used by _evict_summaries
+        os.utime(path)
+    return summary
+
+def _evict_summaries():
+    files = sorted(SUMMARY_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime)
+    for path in files[:max(0, len(files) - SUMMARY_MAX_FILES)]:
+        path.unlink(missing_ok=True)
+
+def _summarize(job: Job, doc_hash: str, text: str, sentences_count: int) -> dict:
+    key = (doc_hash, sentences_count)
+    try:
+        if CURRENT["doc_hash"] != doc_hash:
+            # replaced while queued; it is summarized again if it comes back
+            job.update("skipped")
+            return {"status": "skipped"}
+        job.update("summarizing")
+        summary = summarize_textrank(text, sentences_count=sentences_count)
+        tmp = _summary_path(doc_hash, sentences_count).with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(summary, f)
+        tmp.replace(_summary_path(doc_hash, sentences_count))
+        _evict_summaries()
+        with SUMMARY_LOCK:
+            SUMMARY_FAILURES.pop(key, None)
+        return {"summary_points": summary}
+    except Exception as e:
+        with SUMMARY_LOCK:
+            failures = SUMMARY_FAILURES.get(key, {}).get("failures", 0) + 1
+            delay = min(SUMMARY_RETRY_MAX, SUMMARY_RETRY_BASE * 2 ** (failures - 1))
+            SUMMARY_FAILURES[key] = {"failures": failures, "retry_at": time.time() + delay, "error": str(e)}
+        raise
+    finally:
+        with SUMMARY_LOCK:
+            SUMMARY_PENDING.discard(key)
+
+def _summary_failure(doc_hash: str, sentences_count: int) -> Optional[dict]:
+    """The last failure of this summary while its retry is still backing off, else None."""
+    with SUMMARY_LOCK:
+        failure = SUMMARY_FAILURES.get((doc_hash, sentences_count))
+        if failure is not None and failure["retry_at"] > time.time():
+            return dict(failure)
+    return None
+
+def _request_summary(doc_hash: str, text: str, sentences_count: int) -> Optional[List[str]]:
+    """
+    The cached summary, or None after making sure a background job is computing it
+    (unless the last attempt failed and its retry is still backing off).
+    """
+    summary = _load_summary(doc_hash, sentences_count, touch=True)
+    if summary is not None:
+        return summary
+    with SUMMARY_LOCK:
+        key = (doc_hash, sentences_count)
+        if key in SUMMARY_PENDING:
+            return None
+        failure = SUMMARY_FAILURES.get(key)
+        if failure is not None and failure["retry_at"] > time.time():
+            return None
+        # the job may have finished since the first check
+        summary = _load_summary(doc_hash, sentences_count)
+        if summary is None:
+            SUMMARY_PENDING.add(key)
+            BACKGROUND_JOBS.submit(_summarize, doc_hash, text, sentences_count)
+    return summary
 
 @app.get("/summary")
-def get_summary():
+def get_summary(sentences_count: int = Query(SUMMARY_SENTENCES, ge=1, le=50)):
     if not CURRENT.get("file_id"):
         raise HTTPException(status_code=404, detail="No file uploaded yet.")
-    return {"file_id": CURRENT["file_id"], "filename": CURRENT["filename"], "summary": CURRENT["summary"]}
+    summary = _request_summary(CURRENT["doc_hash"], CURRENT["text"], sentences_count)
+    failure = _summary_failure(CURRENT["doc_hash"], sentences_count) if summary is None else None
+    if failure is not None:
+        retry_after = max(1, int(failure["retry_at"] - time.time()))
+        return JSONResponse(status_code=503, headers={"Retry-After": str(retry_after)},
+                            content={"status": "failed", "error": failure["error"], "retry_after": retry_after,
+                                     "file_id": CURRENT["file_id"], "filename": CURRENT["filename"]})
+    if summary is None:
+        # still being computed in the background; poll again
+        return JSONResponse(status_code=202, content={"status": "pending", "file_id": CURRENT["file_id"], "filename": CURRENT["filename"]})
+    return {"status": "ready", "file_id": CURRENT["file_id"], "filename": CURRENT["filename"], "summary": summary}
 
 @app.post("/query")
-def query(qr: QueryRequest):
+async def query(qr: QueryRequest):
     if not CURRENT.get("file_id"):
         raise HTTPException(status_code=404, detail="No file uploaded yet.")
-    answer, used_chunks = answer_question_from_context(
+    answer, used_chunks = await answer_question_from_context(
         qr.question,
         CURRENT["chunks"],
         CURRENT["index"],
-        top_k=qr.top_k
+        top_k=qr.top_k,
+        doc_hash=CURRENT["doc_hash"]
     )
     return {"question": qr.question, "answer": answer, "used_chunks": used_chunks}
 
+@app.post("/query/stream")
+async def query_stream(qr: QueryRequest):
+    """
+    /query as server-sent events: "context" (retrieved chunks), "token" per generated
+    piece, "fallback" (extractive answer, on failure or without a generation model)
+    and a final "done" with the whole answer.
+    """
+    if not CURRENT.get("file_id"):
+        raise HTTPException(status_code=404, detail="No file uploaded yet.")
+    index, doc_hash = CURRENT["index"], CURRENT["doc_hash"]
+
+    async def events():
+        async for event, data in stream_answer_from_context(qr.question, index, top_k=qr.top_k, doc_hash=doc_hash):
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    # no-cache / no buffering so proxies pass tokens through as they arrive
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _quiz_bank(job: Job = None) -> QuizBank:
+    """The current document's quiz bank, built once and shared by all /quiz calls."""
+    bank = CURRENT.get("quiz_bank")
+    if bank is not None:
+        return bank
+    with QUIZ_BANK_LOCK:
+        file_id, text, index = CURRENT["file_id"], CURRENT["text"], CURRENT["index"]
+        bank = CURRENT.get("quiz_bank")
+        if bank is None:
+            if job:
+                job.update("building quiz bank")
+            # distractors ranked with the same shared model that embedded the chunks
+            bank = QuizBank.build(text, model_name=index.model_name)
+            # a new upload may have replaced the document meanwhile
+            if CURRENT["file_id"] == file_id:
+                CURRENT["quiz_bank"] = bank
+    return bank
+
+def _build_quiz_bank(job: Job, file_id: str) -> dict:
+    """Background job: build the quiz bank of file_id, unless another document replaced it."""
+    if CURRENT["file_id"] != file_id:
+        job.update("skipped")
+        return {"status": "skipped"}
+    bank = _quiz_bank(job)
+    return {"status": "ok", "questions": len(bank)}
+
+def _quiz_seed(qr: QuizRequest) -> int:
+    # unseeded requests get a fresh seed, returned so the quiz can be reproduced
+    return qr.seed if qr.seed is not None else random.randrange(2**31)
+
+def _quiz_items(num_questions: int, seed: int, text: str, window_quizzes: set) -> Iterator[dict]:
+    """
+    The quiz for (num_questions, seed), one question at a time. While the quiz bank is
+    still being built (its build is started if needed), questions come from text
+    windows tagged on the fly; such quizzes are remembered, so the same seed keeps
+    getting the same questions after the bank is ready.
+    """
+    with WINDOW_QUIZ_LOCK:
+        from_windows = (num_questions, seed) in window_quizzes or (
+            CURRENT.get("quiz_bank") is None and len(window_quizzes) < WINDOW_QUIZZES_MAX)
+        if from_windows:
+            window_quizzes.add((num_questions, seed))
+    if not from_windows:
+        return _quiz_bank().iter_sample(num_questions, rng=random.Random(seed))
+    if CURRENT.get("quiz_bank") is None and not QUIZ_BANK_LOCK.locked():
+        BACKGROUND_JOBS.submit(_build_quiz_bank, CURRENT["file_id"])
+    return iter_quiz_incremental(text, num_questions, rng=random.Random(seed))
+
 @app.post("/quiz")
 def quiz(qr: QuizRequest):
     if not CURRENT.get("file_id"):
         raise HTTPException(status_code=404, detail="No file uploaded yet.")
-    quiz = generate_quiz_from_text(CURRENT["text"], qr.num_questions)
+    seed = _quiz_seed(qr)
+    key = (CURRENT["doc_hash"], qr.num_questions, seed)
+    # only explicitly seeded quizzes are asked for again; one-off random ones would
+    # just push the shared quizzes out of the cache
+    quiz = QUIZ_CACHE.get(key) if qr.seed is not None else None
+    if quiz is None:
+        quiz = list(_quiz_items(qr.num_questions, seed, CURRENT["text"], CURRENT["window_quizzes"]))
+        if qr.seed is not None:
+            QUIZ_CACHE.put(key, quiz)
     # quiz: list of {"question":..., "options":[...], "answer": index}
-    return {"quiz": quiz}
+    return {"quiz": quiz, "seed": seed}
+
+@app.post("/quiz/stream")
+def quiz_stream(qr: QuizRequest):
+    """
+    Same quiz as /quiz, streamed as NDJSON: one JSON object per line, sent as soon
+    as each question is ready. The seed is returned in the X-Quiz-Seed header.
+    While the quiz bank is still being built, the first question costs one tagged
+    text window, seeded or not (see _quiz_items).
+    """
+    if not CURRENT.get("file_id"):
+        raise HTTPException(status_code=404, detail="No file uploaded yet.")
+    seed = _quiz_seed(qr)
+    key = (CURRENT["doc_hash"], qr.num_questions, seed)
+    text, window_quizzes = CURRENT["text"], CURRENT["window_quizzes"]
+
+    def lines():
+        cached = QUIZ_CACHE.get(key) if qr.seed is not None else None
+        if cached is not None:
+            for item in cached:
+                yield json.dumps(item) + "\n"
+            return
+        quiz = []
+        for item in _quiz_items(qr.num_questions, seed, text, window_quizzes):
+            quiz.append(item)
+            yield json.dumps(item) + "\n"
+        if qr.seed is not None:
+            QUIZ_CACHE.put(key, quiz)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"X-Quiz-Seed": str(seed)})
 
 @app.get("/status")
 def status():
     if not CURRENT.get("file_id"):
-        return {"status": "no_file"}
+        return {"status": "no_file", "ingest_cache": INGEST_CACHE.stats()}
     return {
         "status": "ready",
         "file_id": CURRENT["file_id"],
         "filename": CURRENT["filename"],
         "num_chunks": len(CURRENT["chunks"]),
-        "summary_count": len(CURRENT["summary"]) if CURRENT["summary"] else 0
+        "summary_count": len(_load_summary(CURRENT["doc_hash"], SUMMARY_SENTENCES) or []),
+        "quiz_bank_size": len(CURRENT["quiz_bank"]) if CURRENT["quiz_bank"] is not None else None,
+        "quiz_cache": QUIZ_CACHE.stats(),
+        "answer_cache": answer_cache_stats(),
+        "query_embedding_cache": QUERY_EMBEDDING_CACHE.stats(),
+        "ingest_cache": INGEST_CACHE.stats()
     }
+
+@app.get("/models")
+def models():
+    # load time and resident memory per shared embedding model, and query batching latency
+    return {"models": model_stats(), "query_batching": batcher_stats()}
@@ -0,0 +1,145 @@
+# backend/utils/ann.py
+import os
+import pickle
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# retrieval backend: "numpy" (brute force, no extra dependency) or a FAISS index:
+# "flat" (exact), "ivf" (inverted lists) or "hnsw" (graph)
+INDEX_BACKEND = os.environ.get("INDEX_BACKEND", "numpy").lower()
+IVF_NLIST = int(os.environ.get("IVF_NLIST", 1024))
+IVF_NPROBE = int(os.environ.get("IVF_NPROBE", 16))
+HNSW_M = int(os.environ.get("HNSW_M", 32))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("HNSW_EF_CONSTRUCTION", 80))
+HNSW_EF_SEARCH = int(os.environ.get("HNSW_EF_SEARCH", 64))
+
+BACKENDS = ("numpy", "flat", "ivf", "hnsw")
+
+
+def _import_faiss():
+    try:
+        import faiss
+    except ImportError:
+        raise RuntimeError("faiss required for INDEX_BACKEND flat/ivf/hnsw (pip install faiss-cpu)")
+    return faiss
+
+
+class BruteForceIndex:
+    """Exact search over unit-normalized rows: one matrix-vector product plus argpartition."""
+
+    kind = "numpy"
+
+    def __init__(self, embeddings: np.ndarray):
+        self.embeddings = embeddings
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    def search(self, q: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        # rows are unit vectors, so the dot product is the cosine similarity
+        sims = self.embeddings @ q
+        k = min(k, len(sims))
+        if k <= 0:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+        # top-k by partial selection, then order just those k
+        idxs = np.argpartition(-sims, k - 1)[:k]
+        idxs = idxs[np.argsort(-sims[idxs])]
+        return sims[idxs], idxs
+
+
+class FaissIndex:
+    """
+    A FAISS index over unit-normalized rows. Scores are cosine similarities; L2
+    indexes (such as the original faiss_index.index) are converted on the way out.
+    """
+
+    def __init__(self, index, kind: str):
+        self.index = index
+        self.kind = kind
+
+    def __len__(self) -> int:
+        return self.index.ntotal
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, kind: str) -> "FaissIndex":
+        faiss = _import_faiss()
+        emb = np.ascontiguousarray(embeddings, dtype=np.float32)
+        n, dim = emb.shape
+        if kind == "flat":
+            index = faiss.IndexFlatIP(dim)
+        elif kind == "ivf":
+            # IVF needs enough training points per list; shrink nlist for small corpora
+            nlist = max(1, min(IVF_NLIST, n // 39))
+            index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dim), dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.train(emb)
+            index.nprobe = min(IVF_NPROBE, nlist)
+        elif kind == "hnsw":
+            index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+            index.hnsw.efSearch = HNSW_EF_SEARCH
+        else:
+            raise ValueError(f"Unknown index backend {kind!r} (expected one of {', '.join(BACKENDS)})")
+        index.add(emb)
+        return cls(index, kind)
+
+    def search(self, q: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, self.index.ntotal)
+        if k <= 0:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+        scores, idxs = self.index.search(np.ascontiguousarray(q, dtype=np.float32).reshape(1, -1), k)
+        scores, idxs = scores[0], idxs[0]
+        keep = idxs >= 0
+        scores, idxs = scores[keep], idxs[keep]
+        if self.index.metric_type == _import_faiss().METRIC_L2:
+            # squared L2 between unit vectors: |a - b|^2 = 2 - 2 cos
+            scores = 1.0 - scores / 2.0
+        return scores, idxs
+
+    def save(self, path: Path):
+        _import_faiss().write_index(self.index, str(path))
+
+    @classmethod
+    def load(cls, path: Path) -> "FaissIndex":
+        faiss = _import_faiss()
+        index = faiss.read_index(str(path))
+        if isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = HNSW_EF_SEARCH
+            kind = "hnsw"
+        elif isinstance(index, faiss.IndexIVF):
+            index.nprobe = min(IVF_NPROBE, index.nlist)
+            kind = "ivf"
+        else:
+            kind = "flat"
+        return cls(index, kind)
+
+
+def build_ann(embeddings: np.ndarray, kind: Optional[str] = None):
+    kind = (kind or INDEX_BACKEND).lower()
+    if kind == "numpy":
+        return BruteForceIndex(embeddings)
+    return FaissIndex.build(embeddings, kind)
+
+
+def save_faiss_layout(ann: FaissIndex, metadata: List[dict], index_path: Path, meta_path: Path):
+    """
+    Write the index in the faiss_index.index + faiss_metadata.pkl layout: the FAISS
+    index file and a pickled list with one metadata dict per vector, in id order.
+    """
+    tmp = Path(str(index_path) + ".tmp")
+    ann.save(tmp)
+    tmp.replace(index_path)
+    tmp = Path(str(meta_path) + ".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(metadata, f, protocol=4)
+    tmp.replace(meta_path)
+
+
+def load_faiss_layout(index_path: Path, meta_path: Path) -> Optional[Tuple[FaissIndex, List[dict]]]:
+    if not Path(index_path).exists() or not Path(meta_path).exists():
+        return None
+    ann = FaissIndex.load(index_path)
+    with open(meta_path, "rb") as f:
+        metadata = pickle.load(f)
+    return ann, metadata
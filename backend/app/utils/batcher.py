@@ -0,0 +1,130 @@
+# backend/utils/batcher.py
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict
+
+import numpy as np
+
+from .model_registry import get_model
+
+# queries arriving within QUERY_BATCH_WINDOW_MS of the first one in a batch are encoded
+# together in one forward pass (at most QUERY_BATCH_MAX); a window of 0 encodes each alone
+QUERY_BATCH_WINDOW_MS = float(os.environ.get("QUERY_BATCH_WINDOW_MS", 5))
+QUERY_BATCH_MAX = int(os.environ.get("QUERY_BATCH_MAX", 32))
+# longest a caller waits for its batch before giving up (seconds)
+QUERY_BATCH_TIMEOUT = float(os.environ.get("QUERY_BATCH_TIMEOUT", 30))
+# latencies kept for the percentiles
+LATENCY_SAMPLES = 10000
+
+
+class QueryBatcher:
+    """
+    Coalesces concurrent single-query encodes for one model. Callers block in
+    encode() while a worker thread collects the queries that arrive within
+    window_ms, encodes them as one batch and hands each caller its own row.
+    """
+
+    def __init__(self, model_name: str, window_ms: float = QUERY_BATCH_WINDOW_MS,
+                 max_batch: int = QUERY_BATCH_MAX):
+        self.model_name = model_name
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.batches = 0
+        self.queries = 0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _encode(self, texts):
+        return get_model(self.model_name).encode(texts, batch_size=len(texts), show_progress_bar=False,
+                                                 convert_to_numpy=True, normalize_embeddings=True).astype(np.float32, copy=False)
+
+    def encode(self, text: str) -> np.ndarray:
+        """Unit-normalized float32 embedding of text, computed in a shared batch."""
+        started = time.perf_counter()
+        if self.window <= 0:
+            emb = self._encode([text])[0]
+            with self._lock:
+                self.batches += 1
+                self.queries += 1
+                self._latencies.append(time.perf_counter() - started)
+            return emb
+        self._ensure_worker()
+        fut = Future()
+        self._queue.put((text, fut))
+        emb = fut.result(timeout=QUERY_BATCH_TIMEOUT)
+        with self._lock:
+            self._latencies.append(time.perf_counter() - started)
+        return emb
+
+    def _ensure_worker(self):
+        # (re)started on demand, so a worker that died cannot strand later callers
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name=f"query-batcher-{self.model_name}", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            texts = [text for text, _ in batch]
+            try:
+                embs = self._encode(texts)
+                with self._lock:
+                    self.batches += 1
+                    self.queries += len(batch)
+                for (_, fut), emb in zip(batch, embs):
+                    # a copy: a row view would keep the whole batch matrix alive in caches
+                    fut.set_result(emb.copy())
+            except BaseException as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                if not isinstance(e, Exception):
+                    raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            lat = np.array(self._latencies, dtype=np.float64)
+            return {
+                "window_ms": self.window * 1000.0,
+                "max_batch": self.max_batch,
+                "batches": self.batches,
+                "queries": self.queries,
+                "mean_batch_size": round(self.queries / self.batches, 2) if self.batches else 0.0,
+                "p50_ms": round(float(np.percentile(lat, 50)) * 1000.0, 2) if len(lat) else None,
+                "p99_ms": round(float(np.percentile(lat, 99)) * 1000.0, 2) if len(lat) else None,
+            }
+
+
+# one batcher (and worker thread) per model name for the whole process
+_BATCHERS: Dict[str, QueryBatcher] = {}
+_LOCK = threading.Lock()
+
+
+def get_batcher(model_name: str) -> QueryBatcher:
+    batcher = _BATCHERS.get(model_name)
+    if batcher is None:
+        with _LOCK:
+            batcher = _BATCHERS.setdefault(model_name, QueryBatcher(model_name))
+    return batcher
+
+
+def batcher_stats() -> Dict[str, dict]:
+    """Batch sizes and p50/p99 encode latency (queue wait included) per model."""
+    return {name: b.stats() for name, b in list(_BATCHERS.items())}
@@ -0,0 +1,143 @@
+# backend/utils/cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+import numpy as np
+
+
+class LRUCache:
+    """
+    Small thread-safe in-memory LRU cache with hit/miss counters. With a ttl (in
+    seconds) entries also expire that long after they were stored.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._data = OrderedDict()  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key in self._data:
+                value, expires_at = self._data[key]
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.expired += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "expired": self.expired,
+                "entries": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
+
+
+class SemanticCache:
+    """
+    Answer cache matched on meaning rather than text. Each bucket (e.g. one per
+    document) holds up to maxsize unit-normalized query embeddings in one matrix;
+    a lookup is a single matrix-vector product, and the best match counts as a hit
+    when its cosine similarity is at least threshold. When a bucket is full the
+    oldest row is overwritten; the least recently used bucket goes past max_buckets.
+    """
+
+    def __init__(self, maxsize: int = 512, threshold: float = 0.92, ttl: Optional[float] = None,
+                 max_buckets: int = 16):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_buckets = max_buckets
+        self.hits = 0
+        self.misses = 0
+        self._buckets = OrderedDict()  # key -> {"emb", "values", "stored_at", "n", "next"}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, q_emb: np.ndarray) -> Optional[Any]:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None and bucket["n"]:
+                n = bucket["n"]
+                sims = bucket["emb"][:n] @ q_emb
+                if self.ttl:
+                    sims[bucket["stored_at"][:n] + self.ttl <= time.monotonic()] = -np.inf
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    self._buckets.move_to_end(key)
+                    self.hits += 1
+                    return bucket["values"][best]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, q_emb: np.ndarray, value: Any):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = {
+                    "emb": np.zeros((self.maxsize, len(q_emb)), dtype=np.float32),
+                    "values": [None] * self.maxsize,
+                    "stored_at": np.zeros(self.maxsize, dtype=np.float64),
+                    "n": 0,
+                    "next": 0,
+                }
+                self._buckets[key] = bucket
+            row = bucket["next"]
+            bucket["emb"][row] = q_emb
+            bucket["values"][row] = value
+            bucket["stored_at"][row] = time.monotonic()
+            bucket["n"] = max(bucket["n"], row + 1)
+            bucket["next"] = (row + 1) % self.maxsize
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": sum(b["n"] for b in self._buckets.values()),
+                "buckets": len(self._buckets),
+                "maxsize": self.maxsize,
+                "threshold": self.threshold,
+                "ttl": self.ttl,
+            }
@@ -1,18 +1,108 @@
 # backend/utils/chunker.py
-from typing import List
+from array import array
+from collections import deque
+from typing import Iterable, Iterator, List, Tuple
 import re
 
+PAGE_SEP = "\n"
+
+
+class ChunkTable:
+    """
+    Chunks stored as (start_char, end_char, page) spans into one source text
+    instead of as separate strings. Overlapping chunks share the source text, and
+    a chunk's string is only sliced out when it is indexed.
+    """
+
+    def __init__(self, text: str = "", starts=None, ends=None, pages=None):
+        self.text = text
+        self.starts = starts if starts is not None else array("q")
+        self.ends = ends if ends is not None else array("q")
+        self.pages = pages if pages is not None else array("q")
+
+    def append(self, start: int, end: int, page: int):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.pages.append(page)
+
+    def span(self, i: int) -> dict:
+        return {"start_char": int(self.starts[i]), "end_char": int(self.ends[i]), "page": int(self.pages[i])}
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self.text[int(self.starts[i]):int(self.ends[i])]
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+
+def iter_chunk_spans(pages: Iterable[Tuple[int, str]], chunk_size: int = 500,
+                     overlap: int = 50) -> Iterator[Tuple[int, int, int, str]]:
+    """
+    Incremental chunking over a stream of (page_no, text) pairs. Yields
+    (start_char, end_char, page, chunk) as soon as chunk_size words have arrived,
+    with offsets into PAGE_SEP.join(page texts). Only the pages the current window
+    touches are kept in memory.
+    """
+    step = max(1, chunk_size - overlap)
+    window = deque()  # (start, end, page) per word
+    held = deque()    # (base offset, text) of pages the window still touches
+    base = 0
+
+    def emit():
+        start, end, page = window[0][0], window[-1][1], window[0][2]
+        while held[0][0] + len(held[0][1]) < start:
+            held.popleft()
+        first = held[0][0]
+        if end <= first + len(held[0][1]):
+            chunk = held[0][1][start - first:end - first]
+        else:
+            chunk = PAGE_SEP.join(text for _, text in held)[start - first:end - first]
+        return start, end, page, chunk
+
+    for page_no, text in pages:
+        held.append((base, text))
+        for m in re.finditer(r"\S+", text):
+            window.append((base + m.start(), base + m.end(), page_no))
+            if len(window) == chunk_size:
+                yield emit()
+                for _ in range(step):
+                    window.popleft()
+        base += len(text) + len(PAGE_SEP)
+    # trailing windows, as chunk_text emits a window for every start inside the text
+    while window:
+        yield emit()
+        if len(window) <= step:
+            break
+        for _ in range(step):
+            window.popleft()
+
+
+def iter_chunks(texts: Iterable[str], chunk_size: int = 500, overlap: int = 50) -> Iterator[str]:
+    """
+    Incremental chunk_text over a stream of text pieces (e.g. pages). A chunk is
+    emitted as soon as chunk_size words have arrived, so only about one chunk of
+    words is held in memory at a time.
+    """
+    for _, _, _, chunk in iter_chunk_spans(enumerate(texts, start=1), chunk_size, overlap):
+        yield chunk
+
+
+def chunk_table(text: str, chunk_size: int = 500, overlap: int = 50) -> ChunkTable:
+    """chunk_text as a ChunkTable of spans into text."""
+    table = ChunkTable(text)
+    for start, end, page, _ in iter_chunk_spans([(1, text)], chunk_size, overlap):
+        table.append(start, end, page)
+    return table
+
+
 def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
     """
     Split text into overlapping chunks of chunk_size tokens (approx by words).
     """
-    words = re.split(r"\s+", text)
-    chunks = []
-    i = 0
-    while i < len(words):
-        chunk_words = words[i:i+chunk_size]
-        chunk = " ".join(chunk_words).strip()
-        if chunk:
-            chunks.append(chunk)
-        i += (chunk_size - overlap)
-    return chunks
+    return list(iter_chunks([text], chunk_size=chunk_size, overlap=overlap))
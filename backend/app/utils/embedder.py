@@ -1,23 +1,182 @@
 # backend/utils/embeddings.py
-from sentence_transformers import SentenceTransformer
+import json
+import os
+import re
+import shutil
+import uuid
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from typing import List
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+from .ann import INDEX_BACKEND, build_ann
+from .batcher import get_batcher
+from .cache import LRUCache
+from .chunker import ChunkTable
+from .model_registry import DEFAULT_MODEL, get_model
+
+def normalize_query(text: str) -> str:
+    """Case, surrounding punctuation and whitespace runs don't change what is asked."""
+    return re.sub(r"\s+", " ", text).strip().strip("?!.").strip().lower()
+
+# query vectors depend only on the model and the question, not on the corpus, so one
+# cache serves every index in the process: (model name, normalized query) -> embedding
+QUERY_EMBEDDING_CACHE = LRUCache(maxsize=int(os.environ.get("QUERY_EMBEDDING_CACHE_SIZE", 4096)))
 
 class EmbeddingIndex:
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
-        # small, fast model for CPU
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name: str = DEFAULT_MODEL, backend: Optional[str] = None):
+        # small, fast model for CPU; shared across all indexes in the process
+        self.model_name = model_name
+        # search structure over the embeddings (see ann.py), built on first query
+        self.backend = (backend or INDEX_BACKEND).lower()
+        self.ann = None
         self.texts = []
         self.embeddings = None
 
-    def add_texts(self, texts: List[str]):
-        self.texts = texts
-        self.embeddings = self.model.encode(texts, show_progress_bar=False, convert_to_numpy=True)
+    @property
+    def model(self):
+        return get_model(self.model_name)
 
-    def query(self, query_text: str, top_k: int = 5):
-        q_emb = self.model.encode([query_text], show_progress_bar=False, convert_to_numpy=True)
-        sims = cosine_similarity(q_emb, self.embeddings)[0]
-        idxs = sims.argsort()[::-1][:top_k]
-        results = [(int(i), float(sims[i]), self.texts[i]) for i in idxs]
+    def add_texts(self, texts: List[str], batch_size: int = 64,
+                  progress: Optional[Callable[[int, int], None]] = None):
+        """
+        Embed texts in batches of batch_size. progress, if given, is called as
+        progress(batch, num_batches) after each batch.
+        """
+        num_batches = max(1, (len(texts) + batch_size - 1) // batch_size)
+        self.add_stream(texts, batch_size=batch_size,
+                        progress=(lambda b, _: progress(b, num_batches)) if progress else None)
+
+    def add_stream(self, texts: Iterable[str], batch_size: int = 64,
+                   progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                   keep_texts: bool = True):
+        """
+        Embed texts from an iterable (e.g. iter_chunks over extracted pages), encoding
+        each batch as soon as it fills up so embedding overlaps with extraction.
+        progress, if given, is called as progress(batch, None) after each batch.
+        With keep_texts=False the strings are dropped after encoding and the caller
+        sets self.texts (e.g. to a ChunkTable).
+        """
+        self.texts = []
+        parts = []
+        batch = []
+
+        def flush():
+            # unit-normalized once here, so a query is a single dot product
+            parts.append(self.model.encode(batch, batch_size=batch_size, show_progress_bar=False,
+                                           convert_to_numpy=True, normalize_embeddings=True).astype(np.float32, copy=False))
+            if keep_texts:
+                self.texts.extend(batch)
+            batch.clear()
+            if progress:
+                progress(len(parts), None)
+
+        for text in texts:
+            batch.append(text)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        self.embeddings = np.ascontiguousarray(np.vstack(parts)) if parts else np.zeros((0, 0), dtype=np.float32)
+        self.ann = None
+
+    def ensure_ann(self):
+        """Build the configured search structure over the embeddings if not built yet."""
+        if self.ann is None:
+            self.ann = build_ann(self.embeddings, self.backend)
+        return self.ann
+
+    def encode_query(self, query_text: str) -> np.ndarray:
+        """Unit-normalized float32 embedding of a query (read-only; cached per model)."""
+        key = (self.model_name, normalize_query(query_text))
+        q_emb = QUERY_EMBEDDING_CACHE.get(key)
+        if q_emb is None:
+            # concurrent misses are coalesced into one forward pass (see batcher.py)
+            q_emb = get_batcher(self.model_name).encode(query_text)
+            q_emb.flags.writeable = False
+            QUERY_EMBEDDING_CACHE.put(key, q_emb)
+        return q_emb
+
+    def query_vector(self, q_emb: np.ndarray, top_k: int = 5):
+        scores, idxs = self.ensure_ann().search(q_emb, top_k)
+        results = [(int(i), float(score), self.texts[i]) for score, i in zip(scores, idxs)]
         return results
+
+    def query(self, query_text: str, top_k: int = 5):
+        return self.query_vector(self.encode_query(query_text), top_k)
+
+    def save(self, path: Path):
+        """
+        Persist the index as a directory: embeddings.npy (raw float32, mmap-able),
+        the chunks and meta.json. A ChunkTable is stored as source.txt plus a
+        spans.npy of (start_char, end_char, page) rows, plain lists as texts.json.
+        Every save writes its files into a new version subdirectory, and meta.json
+        (replaced last) points at it. Files of an earlier version that may still be
+        memory-mapped are never overwritten: Windows refuses to replace a mapped
+        file. Old versions are removed once nothing holds them open.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        version = f"v-{uuid.uuid4().hex[:12]}"
+        data = path / version
+        data.mkdir()
+        emb = np.ascontiguousarray(self.embeddings, dtype=np.float32)
+        np.save(data / "embeddings.npy", emb)
+        if isinstance(self.texts, ChunkTable):
+            table = self.texts
+            spans = np.column_stack([np.asarray(a, dtype=np.int64) for a in (table.starts, table.ends, table.pages)])
+            np.save(data / "spans.npy", spans.reshape(-1, 3))
+            (data / "source.txt").write_text(table.text, encoding="utf-8")
+            chunks = "spans"
+        else:
+            with open(data / "texts.json", "w", encoding="utf-8") as f:
+                json.dump(list(self.texts), f, ensure_ascii=False)
+            chunks = "texts"
+        meta = {"model_name": self.model_name, "count": int(emb.shape[0]), "dim": int(emb.shape[1]),
+                "chunks": chunks, "normalized": True, "data": version}
+        tmp = path / "meta.tmp.json"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        tmp.replace(path / "meta.json")
+        # earlier versions, and files from before versioned saves; a version that is
+        # still mapped (on Windows) fails to delete and is retried on the next save
+        for old in path.iterdir():
+            if old.name in (version, "meta.json"):
+                continue
+            try:
+                if old.is_dir():
+                    shutil.rmtree(old)
+                else:
+                    old.unlink()
+            except OSError:
+                pass
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> Optional["EmbeddingIndex"]:
+        """
+        Restore an index written by save(). With mmap=True the embedding matrix is
+        memory-mapped read-only, so pages are only read from disk when queried.
+        Returns None if no complete index exists at path.
+        """
+        path = Path(path)
+        meta_path = path / "meta.json"
+        if not meta_path.exists():
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(model_name=meta.get("model_name", DEFAULT_MODEL))
+        # indexes saved before versioned saves keep their files next to meta.json
+        path = path / meta.get("data", ".")
+        index.embeddings = np.load(path / "embeddings.npy", mmap_mode="r" if mmap else None)
+        if not meta.get("normalized"):
+            # indexes saved before embeddings were normalized at insert time
+            emb = np.asarray(index.embeddings, dtype=np.float32)
+            norms = np.linalg.norm(emb, axis=1, keepdims=True)
+            index.embeddings = np.ascontiguousarray(emb / np.maximum(norms, 1e-12))
+        if meta.get("chunks") == "spans":
+            spans = np.load(path / "spans.npy", mmap_mode="r" if mmap else None)
+            text = (path / "source.txt").read_text(encoding="utf-8")
+            index.texts = ChunkTable(text, spans[:, 0], spans[:, 1], spans[:, 2])
+        else:
+            with open(path / "texts.json", encoding="utf-8") as f:
+                index.texts = json.load(f)
+        return index
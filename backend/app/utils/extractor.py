@@ -1,7 +1,15 @@
 # backend/utils/extractor.py
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterator, List, Optional, Tuple
 import io
+import os
+
+from .procpool import get_process_pool
+
+# parallel PDF extraction: worker processes, and the page count below which the
+# pool start-up cost outweighs the gain and pages are read serially
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", os.cpu_count() or 1))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", 50))
 
 def _read_txt(path: Path) -> str:
     return path.read_text(encoding="utf-8", errors="ignore")
@@ -15,29 +23,83 @@ def _read_docx(path: Path) -> str:
     paragraphs = [p.text for p in doc.paragraphs if p.text]
     return "\n".join(paragraphs)
 
-def _read_pdf(path: Path) -> str:
+def _import_pypdf2():
     # lightweight: use PyPDF2
     try:
         import PyPDF2
     except ImportError:
         raise RuntimeError("PyPDF2 required (pip install PyPDF2)")
-    text = []
+    return PyPDF2
+
+def _extract_page_range(path: str, start: int, end: int) -> List[str]:
+    """Text of pages [start, end); runs in a worker process, which opens its own reader."""
+    PyPDF2 = _import_pypdf2()
+    with open(path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+def _iter_pdf_pages(path: Path, progress: Optional[Callable[[int, int], None]] = None,
+                    workers: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_no, text) for every PDF page, in page order. Large files are split
+    into page ranges that a process pool extracts concurrently; pages are yielded
+    as soon as every earlier range has finished.
+    """
+    PyPDF2 = _import_pypdf2()
+    workers = PDF_WORKERS if workers is None else workers
     with open(path, "rb") as f:
         reader = PyPDF2.PdfReader(f)
-        for page in reader.pages:
-            txt = page.extract_text()
-            if txt:
-                text.append(txt)
-    return "\n".join(text)
+        num_pages = len(reader.pages)
+        if workers <= 1 or num_pages < PDF_PARALLEL_MIN_PAGES:
+            for page_no, page in enumerate(reader.pages, start=1):
+                if progress:
+                    progress(page_no, num_pages)
+                yield page_no, page.extract_text() or ""
+            return
+
+    # several ranges per worker so a slow range doesn't leave the others idle
+    step = max(1, -(-num_pages // (workers * 4)))
+    ranges = [(start, min(start + step, num_pages)) for start in range(0, num_pages, step)]
+    pool = get_process_pool(workers)
+    futures = [pool.submit(_extract_page_range, str(path), a, b) for a, b in ranges]
+    try:
+        for (start, end), fut in zip(ranges, futures):
+            for offset, txt in enumerate(fut.result()):
+                yield start + offset + 1, txt
+            if progress:
+                progress(end, num_pages)
+    finally:
+        # the pool outlives this call: drop ranges nobody will read
+        for fut in futures:
+            fut.cancel()
+
+def _read_pdf(path: Path, progress: Optional[Callable[[int, int], None]] = None,
+              workers: Optional[int] = None) -> str:
+    return "\n".join(txt for _, txt in _iter_pdf_pages(path, progress, workers) if txt)
+
+def iter_pages(path: Path, progress: Optional[Callable[[int, int], None]] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Streaming variant of extract_text_from_file: yield (page_no, text) pairs so
+    consumers can start work before the whole document is read. Formats without
+    pages (txt, docx) come out as a single page 1.
+    """
+    if path.suffix.lower() == ".pdf":
+        yield from _iter_pdf_pages(path, progress=progress)
+    else:
+        yield 1, extract_text_from_file(path)
 
-def extract_text_from_file(path: Path) -> str:
+def extract_text_from_file(path: Path, progress: Optional[Callable[[int, int], None]] = None) -> str:
+    """
+    Extract plain text from a file. progress, if given, is called as
+    progress(page, num_pages) while PDF pages are read.
+    """
     suffix = path.suffix.lower()
     if suffix in [".txt"]:
         return _read_txt(path)
     elif suffix in [".docx"]:
         return _read_docx(path)
     elif suffix in [".pdf"]:
-        return _read_pdf(path)
+        return _read_pdf(path, progress=progress)
     else:
         # attempt to read as txt
         return _read_txt(path)
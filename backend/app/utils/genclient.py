@@ -0,0 +1,77 @@
+# backend/utils/genclient.py
+import asyncio
+import os
+from typing import AsyncIterator, Optional
+
+# generation backend: Hugging Face Inference API by default; point HF_API_URL at any
+# server with the same /{model} contract (e.g. a local stand-in) to avoid the network
+HF_API_URL = os.environ.get("HF_API_URL", "https://api-inference.huggingface.co/models").rstrip("/")
+GEN_TIMEOUT = float(os.environ.get("GEN_TIMEOUT", 30))
+GEN_CONNECT_TIMEOUT = float(os.environ.get("GEN_CONNECT_TIMEOUT", 5))
+GEN_MAX_CONNECTIONS = int(os.environ.get("GEN_MAX_CONNECTIONS", 20))
+GEN_MAX_KEEPALIVE = int(os.environ.get("GEN_MAX_KEEPALIVE", 10))
+GEN_CONCURRENCY = int(os.environ.get("GEN_CONCURRENCY", 8))
+
+
+class GenerationClient:
+    """
+    Persistent async HTTP client for generation calls. Connections are pooled and
+    kept alive across requests (no TCP/TLS handshake per /query), and at most
+    `concurrency` generation requests are in flight at once.
+    """
+
+    def __init__(self, base_url: str = HF_API_URL, timeout: float = GEN_TIMEOUT,
+                 connect_timeout: float = GEN_CONNECT_TIMEOUT, max_connections: int = GEN_MAX_CONNECTIONS,
+                 max_keepalive: int = GEN_MAX_KEEPALIVE, concurrency: int = GEN_CONCURRENCY):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.concurrency = concurrency
+        # created on first use, inside the running event loop
+        self._client = None
+        self._semaphore = None
+
+    def _ensure_client(self):
+        if self._client is None:
+            try:
+                import httpx
+            except ImportError:
+                raise RuntimeError("httpx required for generation (pip install httpx)")
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_keepalive),
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._client
+
+    async def post_json(self, path: str, payload: dict, token: Optional[str] = None):
+        client = self._ensure_client()
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        async with self._semaphore:
+            resp = await client.post(f"{self.base_url}/{path.lstrip('/')}", headers=headers, json=payload)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def stream_lines(self, path: str, payload: dict, token: Optional[str] = None) -> AsyncIterator[str]:
+        """POST and yield the response body line by line as it arrives."""
+        client = self._ensure_client()
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        async with self._semaphore:
+            async with client.stream("POST", f"{self.base_url}/{path.lstrip('/')}", headers=headers, json=payload) as resp:
+                resp.raise_for_status()
+                async for line in resp.aiter_lines():
+                    if line:
+                        yield line
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
+
+
+# shared by all requests in the process
+GEN_CLIENT = GenerationClient()
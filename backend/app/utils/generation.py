@@ -1,17 +1,145 @@
 # backend/utils/summarizer.py
-from typing import List
+import os
+from typing import List, Optional
+import numpy as np
 from sumy.parsers.plaintext import PlaintextParser
 from sumy.nlp.tokenizers import Tokenizer
 from sumy.summarizers.text_rank import TextRankSummarizer
 import nltk
 
+from .chunker import iter_chunks
+from .model_registry import DEFAULT_MODEL, get_model
+from .procpool import get_process_pool
+
 # Ensure NLTK punkt tokenizer is available
 try:
     nltk.data.find('tokenizers/punkt')
 except LookupError:
     nltk.download('punkt')
 
-def summarize_textrank(text: str, sentences_count: int = 6) -> List[str]:
+# "sumy": sumy's word-overlap TextRank; "vector": embedding similarity graph + NumPy PageRank
+SUMMARY_METHOD = os.environ.get("SUMMARY_METHOD", "sumy").lower()
+# above this many sentences the vector graph keeps only each sentence's nearest neighbours
+TEXTRANK_DENSE_MAX = int(os.environ.get("TEXTRANK_DENSE_MAX", 4000))
+TEXTRANK_KNN = int(os.environ.get("TEXTRANK_KNN", 20))
+# long documents are summarized map-reduce style: sections in parallel, then the partials
+SUMMARY_HIERARCHICAL_MIN_CHARS = int(os.environ.get("SUMMARY_HIERARCHICAL_MIN_CHARS", 300_000))
+SUMMARY_SECTION_WORDS = int(os.environ.get("SUMMARY_SECTION_WORDS", 3000))
+SUMMARY_WORKERS = int(os.environ.get("SUMMARY_WORKERS", os.cpu_count() or 1))
+
+def _similarity_graph(emb: np.ndarray):
+    """
+    Sentence graph with cosine similarities as edge weights (negative ones dropped,
+    no self loops). Dense for small inputs; otherwise a sparse kNN graph built in
+    row blocks so the full n x n matrix is never materialized.
+    """
+    n = len(emb)
+    if n <= TEXTRANK_DENSE_MAX:
+        sims = emb @ emb.T
+        np.maximum(sims, 0, out=sims)
+        np.fill_diagonal(sims, 0)
+        return sims
+    from scipy import sparse
+    k = min(TEXTRANK_KNN, n - 1)
+    rows, cols, vals = [], [], []
+    for b in range(0, n, 2048):
+        block = emb[b:b + 2048] @ emb.T
+        block[np.arange(len(block)), np.arange(b, b + len(block))] = -np.inf
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        rows.append(np.repeat(np.arange(b, b + len(block)), k))
+        cols.append(top.ravel())
+        vals.append(np.maximum(np.take_along_axis(block, top, axis=1).ravel(), 0))
+    graph = sparse.csr_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))), shape=(n, n))
+    # undirected, like TextRank's sentence graph
+    return graph.maximum(graph.T).tocsr()
+
+def textrank_scores(emb: np.ndarray, damping: float = 0.85, tol: float = 1e-6, max_iter: int = 100) -> np.ndarray:
+    """PageRank over the sentence similarity graph of unit-normalized embeddings, by power iteration."""
+    n = len(emb)
+    if n == 0:
+        return np.zeros(0)
+    graph = _similarity_graph(np.asarray(emb, dtype=np.float32))
+    out_weight = np.asarray(graph.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    inv = np.where(dangling, 0, 1 / np.where(dangling, 1, out_weight))
+    scores = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        # rank flows along edges in proportion to their weight; dangling nodes spread evenly
+        spread = graph.T @ (scores * inv)
+        new = (1 - damping) / n + damping * (np.asarray(spread).ravel() + scores[dangling].sum() / n)
+        done = np.abs(new - scores).sum() < tol
+        scores = new
+        if done:
+            break
+    return scores
+
+def _summarize_vector(text: str, sentences_count: int, model_name: str) -> List[str]:
+    sents = nltk.sent_tokenize(text)
+    if len(sents) <= sentences_count:
+        return sents
+    embeddings = get_model(model_name).encode(sents, batch_size=64, show_progress_bar=False,
+                                              convert_to_numpy=True, normalize_embeddings=True)
+    scores = textrank_scores(embeddings)
+    top = np.argpartition(-scores, sentences_count - 1)[:sentences_count]
+    # in document order, like sumy
+    return [sents[i] for i in sorted(top)]
+
+def _summarize_section(section: str, sentences_count: int, method: str) -> List[str]:
+    # runs in a worker process
+    return summarize_textrank(section, sentences_count, method=method)
+
+def summarize_hierarchical(text: str, sentences_count: int = 6, method: Optional[str] = None,
+                           section_words: Optional[int] = None, workers: Optional[int] = None) -> List[str]:
+    """
+    Map-reduce TextRank for very long documents: split the text into sections of
+    section_words words, summarize each section independently (on a process pool
+    for sumy), then summarize the concatenated partial summaries again (recursively, while
+    they are still long). Each graph covers one section, which bounds peak memory.
+    """
+    method = (method or SUMMARY_METHOD).lower()
+    if method == "hierarchical":
+        # sections themselves are summarized with a single-graph engine
+        method = "sumy"
+    section_words = section_words or SUMMARY_SECTION_WORDS
+    workers = SUMMARY_WORKERS if workers is None else workers
+    sections = list(iter_chunks([text], chunk_size=section_words, overlap=0))
+    if len(sections) <= 1:
+        return summarize_textrank(text, sentences_count, method=method)
+
+    counts = [sentences_count] * len(sections)
+    methods = [method] * len(sections)
+    if workers <= 1 or method != "sumy":
+        # "vector" sections are encoded here with the shared model (already multi-threaded);
+        # in worker processes each would load its own copy of it
+        partials = list(map(_summarize_section, sections, counts, methods))
+    else:
+        # sections are independent; map returns the partials in document order
+        partials = list(get_process_pool(workers).map(_summarize_section, sections, counts, methods))
+    del sections
+
+    reduced = " ".join(s for part in partials for s in part)
+    # recurse only while it still shrinks the text meaningfully
+    if len(reduced.split()) > section_words and len(reduced) < len(text) // 2:
+        return summarize_hierarchical(reduced, sentences_count, method=method,
+                                      section_words=section_words, workers=workers)
+    return summarize_textrank(reduced, sentences_count, method=method)
+
+def summarize_textrank(text: str, sentences_count: int = 6, method: Optional[str] = None,
+                       model_name: str = DEFAULT_MODEL) -> List[str]:
+    """
+    Extractive TextRank summary. method "sumy" (default, SUMMARY_METHOD) uses sumy's
+    word-overlap graph; "vector" builds the graph from sentence embeddings of the
+    shared model and runs PageRank with NumPy; "hierarchical" summarizes sections
+    in parallel first. Without an explicit method, texts longer than
+    SUMMARY_HIERARCHICAL_MIN_CHARS go hierarchical automatically.
+    """
+    if method is None and len(text) > SUMMARY_HIERARCHICAL_MIN_CHARS:
+        method = "hierarchical"
+    method = (method or SUMMARY_METHOD).lower()
+    if method == "hierarchical":
+        return summarize_hierarchical(text, sentences_count)
+    if method == "vector":
+        return _summarize_vector(text, sentences_count, model_name)
     parser = PlaintextParser.from_string(text, Tokenizer("english"))
     summarizer = TextRankSummarizer()
     summary = summarizer(parser.document, sentences_count)
@@ -0,0 +1,160 @@
+# backend/utils/ingest_cache.py
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional
+
+from .chunker import ChunkTable
+from .embedder import EmbeddingIndex
+
+
+def _dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+class IngestCache:
+    """
+    Content-addressed cache of processed uploads. An entry is keyed on the file hash
+    plus every pipeline parameter that affects the output, and holds a saved
+    EmbeddingIndex whose ChunkTable carries the extracted text. Entries are evicted
+    least recently used first once the cache grows past max_bytes.
+
+    Disk I/O happens outside the lock: entries are written to a staging directory
+    and renamed into place, entries being read are pinned against eviction, and
+    removed entries are renamed aside before they are deleted. The lock only covers
+    the bookkeeping, so stats() never waits for a large index to load or save.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = 1 << 30):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._reading = Counter()  # key -> readers currently loading it
+        # key -> (last_used, size_bytes); rebuilt from disk so it survives restarts
+        self._entries = {}
+        for entry in self.root.iterdir():
+            if entry.name.startswith("."):
+                # staging or trash left behind by an interrupted write or delete
+                shutil.rmtree(entry, ignore_errors=True)
+            elif (entry / "meta.json").exists():
+                self._entries[entry.name] = (entry.stat().st_mtime, _dir_size(entry))
+
+    @staticmethod
+    def make_key(file_hash: str, **params) -> str:
+        payload = json.dumps({"file": file_hash, **params}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self.root / key
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._reading[key] += 1
+        try:
+            # loaded into RAM: the entry may be evicted once it is no longer pinned
+            index = EmbeddingIndex.load(entry / "index", mmap=False)
+        except Exception:
+            index = None
+        finally:
+            with self._lock:
+                self._reading[key] -= 1
+                if not self._reading[key]:
+                    del self._reading[key]
+        # entries from before chunks were stored as spans have no source text
+        if index is None or not isinstance(index.texts, ChunkTable):
+            with self._lock:
+                doomed = self._detach(key)
+                self.misses += 1
+            self._delete(doomed)
+            return None
+        now = time.time()
+        with self._lock:
+            if key in self._entries:
+                self._entries[key] = (now, self._entries[key][1])
+            self.hits += 1
+        try:
+            # recency survives restarts through the directory mtime
+            os.utime(entry, (now, now))
+        except OSError:
+            pass
+        return {"text": index.texts.text, "index": index}
+
+    def put(self, key: str, index: EmbeddingIndex):
+        with self._lock:
+            if key in self._entries:
+                # content-addressed: an entry for this key already holds the same data
+                return
+        staging = self.root / f".staging-{uuid.uuid4().hex}"
+        staging.mkdir(parents=True)
+        try:
+            index.save(staging / "index")
+            # meta.json last: its presence marks a complete entry
+            with open(staging / "meta.json", "w", encoding="utf-8") as f:
+                json.dump({"created_at": time.time()}, f)
+            size = _dir_size(staging)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        doomed = []
+        with self._lock:
+            if key in self._entries:
+                doomed.append(staging)
+            else:
+                entry = self.root / key
+                if entry.exists():
+                    # a leftover directory without a complete entry
+                    doomed.append(self._trash(entry))
+                staging.rename(entry)
+                self._entries[key] = (time.time(), size)
+                doomed += self._evict()
+        self._delete(doomed)
+
+    def _trash(self, path: Path) -> Path:
+        # a rename is instant; the slow delete happens outside the lock
+        trash = self.root / f".trash-{uuid.uuid4().hex}"
+        path.rename(trash)
+        return trash
+
+    def _detach(self, key: str) -> List[Path]:
+        self._entries.pop(key, None)
+        entry = self.root / key
+        return [self._trash(entry)] if entry.exists() else []
+
+    @staticmethod
+    def _delete(paths: List[Path]):
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _evict(self) -> List[Path]:
+        doomed = []
+        total = sum(size for _, size in self._entries.values())
+        for key in sorted(self._entries, key=lambda k: self._entries[k][0]):
+            if total <= self.max_bytes:
+                break
+            if key in self._reading:
+                continue
+            total -= self._entries[key][1]
+            doomed += self._detach(key)
+        return doomed
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": sum(size for _, size in self._entries.values()),
+                "max_bytes": self.max_bytes,
+            }
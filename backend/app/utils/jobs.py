@@ -0,0 +1,87 @@
+# backend/utils/jobs.py
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+class Job:
+    """Progress record for one background task, updated from the worker thread."""
+
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.status = "queued"  # queued -> running -> done | failed
+        self.stage = None
+        self.current = None
+        self.total = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def update(self, stage: str, current: Optional[int] = None, total: Optional[int] = None):
+        with self._lock:
+            self.stage = stage
+            self.current = current
+            self.total = total
+
+    def progress(self, stage: str) -> Callable[[int, int], None]:
+        """Callback reporting (current, total) for a stage, e.g. pages or batches."""
+        return lambda current, total: self.update(stage, current, total)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "stage": self.stage,
+                "current": self.current,
+                "total": self.total,
+                "result": self.result,
+                "error": self.error,
+                "elapsed": round((self.finished_at or time.time()) - self.created_at, 3),
+            }
+
+
+class JobStore:
+    """
+    Runs tasks on a worker pool so request handlers can return immediately.
+    A task is called as fn(job, *args) and reports progress through job.update().
+    Only the most recent max_jobs records are kept.
+    """
+
+    def __init__(self, max_workers: int = 2, max_jobs: int = 100):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_jobs = max_jobs
+
+    def submit(self, fn: Callable, *args) -> str:
+        job = Job(str(uuid.uuid4()))
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        self._executor.submit(self._run, job, fn, args)
+        return job.id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    @staticmethod
+    def _run(job: Job, fn: Callable, args):
+        job.status = "running"
+        try:
+            job.result = fn(job, *args)
+            job.status = "done"
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
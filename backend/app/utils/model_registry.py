@@ -0,0 +1,58 @@
+# backend/utils/model_registry.py
+import threading
+import time
+from typing import Dict, Iterable
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# one SentenceTransformer per model name for the whole process
+_MODELS: Dict[str, object] = {}
+_STATS: Dict[str, dict] = {}
+_LOCK = threading.Lock()
+_LOAD_LOCKS: Dict[str, threading.Lock] = {}
+
+
+def _model_nbytes(model) -> int:
+    # parameters + buffers is what stays resident once the model is loaded
+    total = 0
+    for t in list(model.parameters()) + list(model.buffers()):
+        total += t.numel() * t.element_size()
+    return total
+
+
+def get_model(model_name: str = DEFAULT_MODEL):
+    """
+    Return the shared SentenceTransformer for model_name, loading it on first use.
+    Concurrent callers asking for the same model wait for a single load.
+    """
+    model = _MODELS.get(model_name)
+    if model is not None:
+        return model
+    with _LOCK:
+        load_lock = _LOAD_LOCKS.setdefault(model_name, threading.Lock())
+    with load_lock:
+        model = _MODELS.get(model_name)
+        if model is not None:
+            return model
+        from sentence_transformers import SentenceTransformer
+        start = time.perf_counter()
+        model = SentenceTransformer(model_name)
+        load_seconds = time.perf_counter() - start
+        _STATS[model_name] = {
+            "load_seconds": round(load_seconds, 3),
+            "resident_bytes": _model_nbytes(model),
+            "loaded_at": time.time(),
+        }
+        _MODELS[model_name] = model
+    return model
+
+
+def warmup(model_names: Iterable[str] = (DEFAULT_MODEL,)):
+    """Load the given models ahead of the first request (e.g. at app startup)."""
+    for name in model_names:
+        get_model(name)
+
+
+def model_stats() -> Dict[str, dict]:
+    """Load time and resident memory of every model loaded in this process."""
+    return {name: dict(stats) for name, stats in _STATS.items()}
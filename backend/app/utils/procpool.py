@@ -0,0 +1,29 @@
+# backend/utils/procpool.py
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+
+# workers are started with "spawn" by default: forking a process that already runs
+# uvicorn, job and batcher threads (and has torch loaded) can deadlock the child
+POOL_START_METHOD = os.environ.get("POOL_START_METHOD", "spawn")
+
+# long-lived pools, one per size, shared by every caller in the process
+_POOLS: Dict[int, ProcessPoolExecutor] = {}
+_LOCK = threading.Lock()
+
+
+def get_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    Return the shared process pool with max_workers workers, starting it on first
+    use. Workers stay up between calls, so the spawn start-up cost is paid once.
+    """
+    with _LOCK:
+        pool = _POOLS.get(max_workers)
+        # a pool that lost a worker is broken for good; replace it
+        if pool is None or getattr(pool, "_broken", False):
+            pool = ProcessPoolExecutor(max_workers=max_workers,
+                                       mp_context=multiprocessing.get_context(POOL_START_METHOD))
+            _POOLS[max_workers] = pool
+        return pool
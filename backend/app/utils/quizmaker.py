@@ -1,8 +1,14 @@
 # backend/utils/quiz_maker.py
+import os
 import random
 import re
-from typing import List
+from collections import Counter
+from typing import Iterator, List
 import nltk
+import numpy as np
+
+from .model_registry import get_model
+from .procpool import get_process_pool
 
 # Ensure required NLTK data is available; try to download if missing:
 try:
@@ -13,73 +19,356 @@ try:
     nltk.data.find("taggers/averaged_perceptron_tagger")
 except:
     nltk.download("averaged_perceptron_tagger")
-from nltk import sent_tokenize, word_tokenize, pos_tag
+from nltk import sent_tokenize, word_tokenize, pos_tag_sents
+
+# POS tagging runs in batches through pos_tag_sents (one tagger per batch instead
+# of one per sentence); documents with many sentences spread batches over processes
+POS_TAG_BATCH = int(os.environ.get("POS_TAG_BATCH", 2000))
+POS_TAG_WORKERS = int(os.environ.get("POS_TAG_WORKERS", os.cpu_count() or 1))
+POS_TAG_PARALLEL_MIN = int(os.environ.get("POS_TAG_PARALLEL_MIN", 8000))
+# most frequent document terms embedded as distractor candidates
+QUIZ_VOCAB_MAX = int(os.environ.get("QUIZ_VOCAB_MAX", 20000))
+# characters of text tagged per step when a quiz is streamed before the bank is built,
+# and how many such windows are tagged before completion questions fill the quiz
+QUIZ_STREAM_WINDOW = int(os.environ.get("QUIZ_STREAM_WINDOW", 20000))
+QUIZ_STREAM_MAX_WINDOWS = int(os.environ.get("QUIZ_STREAM_MAX_WINDOWS", 4))
+_SENT_END = re.compile(r"[.!?][\"')\]]*\s+|\n\s*\n")
+_SPACE = re.compile(r"\s+")
+
+def _is_word(w):
+    # avoid very short tokens or punctuation
+    return re.match(r"^[A-Za-z0-9\-\']+$", w) and len(w) > 2
 
-def _extract_candidate(sent):
-    toks = word_tokenize(sent)
-    tags = pos_tag(toks)
+def _answer_type(tag):
+    if tag == "CD":
+        return "number"
+    if tag in ("NNP", "NNPS"):
+        return "proper_noun"
+    return "noun"
+
+def _extract_candidate(tags):
     # pick first proper noun (NNP) or numeric (CD) or noun (NN)
     for w, t in tags:
         if t in ("NNP", "NNPS", "CD", "NN"):
-            # avoid very short tokens or punctuation
-            if re.match(r"^[A-Za-z0-9\-\']+$", w) and len(w) > 2:
-                return w
+            if _is_word(w):
+                return w, t
     return None
 
-def generate_quiz_from_text(text: str, num_questions: int = 5):
+def _tag_batch(sents: List[str]):
+    return pos_tag_sents([word_tokenize(s) for s in sents])
+
+def tag_sentences(sents: List[str], batch_size: int = None, workers: int = None):
+    """
+    POS-tag sentences in batches, in order. Runs the batches on a process pool when
+    there are at least POS_TAG_PARALLEL_MIN sentences and more than one worker.
+    """
+    batch_size = batch_size or POS_TAG_BATCH
+    workers = POS_TAG_WORKERS if workers is None else workers
+    batches = [sents[i:i + batch_size] for i in range(0, len(sents), batch_size)]
+    if workers <= 1 or len(batches) <= 1 or len(sents) < POS_TAG_PARALLEL_MIN:
+        results = map(_tag_batch, batches)
+        return [tags for batch in results for tags in batch]
+    # map keeps batch order, so tags line up with sents
+    pool = get_process_pool(workers)
+    return [tags for batch in pool.map(_tag_batch, batches) for tags in batch]
+
+def prepare_quiz_data(text: str) -> dict:
+    """
+    Tokenize and POS-tag the document once: the sentences and their tags.
+    """
     sents = sent_tokenize(text)
-    candidates = []
-    for s in sents:
-        c = _extract_candidate(s)
-        if c:
-            candidates.append((s, c))
-    random.shuffle(candidates)
-    quiz = []
-    used_answers = set()
-    i = 0
-    for sent, answer in candidates:
-        if len(quiz) >= num_questions:
-            break
-        if answer.lower() in used_answers:
-            continue
-        # build options: correct + 3 distractors
-        distractors = []
-        # gather noun pool
-        pool = set()
-        for s2 in sents:
-            toks2 = word_tokenize(s2)
-            for w, t in pos_tag(toks2):
-                if t.startswith("NN") or t == "CD":
-                    if re.match(r"^[A-Za-z0-9\-\']+$", w) and len(w) > 2:
-                        pool.add(w)
-        pool.discard(answer)
-        pool = list(pool)
-        random.shuffle(pool)
-        for p in pool:
-            if len(distractors) >= 3:
-                break
-            if p.lower() != answer.lower():
-                distractors.append(p)
-        if len(distractors) < 3:
-            # fallback: generate simple numeric distractors if answer numeric
-            while len(distractors) < 3:
-                distractors.append(answer + str(random.randint(1,9)))
-        options = [answer] + distractors[:3]
-        random.shuffle(options)
-        ans_index = options.index(answer)
-        # question: replace answer in sentence with blank
-        q_text = re.sub(re.escape(answer), "_____", sent, flags=re.IGNORECASE)
-        quiz.append({"question": q_text, "options": options, "answer_index": ans_index})
-        used_answers.add(answer.lower())
-    # If insufficient items, fall back to simple sentence truncation questions
-    if len(quiz) < num_questions:
+    return {"sents": sents, "tagged": tag_sentences(sents)}
+
+class QuizBank:
+    """
+    Every quiz question a document can produce, built once per document:
+    (sentence, answer, answer type, ranked distractors) per candidate sentence,
+    plus the sentence-completion fallbacks. Serving a quiz only samples from it.
+    """
+
+    NUM_DISTRACTORS = 8  # ranked distractors kept per answer
+
+    def __init__(self, items: List[dict], fallbacks: List[dict]):
+        self.items = items
+        self.fallbacks = fallbacks
+        # items grouped by answer, so a quiz samples distinct answers directly
+        self.by_answer = {}
+        for i, item in enumerate(items):
+            self.by_answer.setdefault(item["answer"].lower(), []).append(i)
+        self.answer_keys = list(self.by_answer)
+
+    def __len__(self):
+        return len(self.items)
+
+    @classmethod
+    def build(cls, text: str, data: dict = None, model_name: str = None) -> "QuizBank":
+        """
+        Build the bank for a document. With model_name, distractors are the terms
+        closest to each answer in that embedding model's space; otherwise they are
+        ranked by frequency in the document.
+        """
+        if data is None:
+            data = prepare_quiz_data(text)
+        sents = data["sents"]
+
+        # distractor pool per answer type, with document frequencies
+        counts = {"number": Counter(), "proper_noun": Counter(), "noun": Counter()}
+        for tags in data["tagged"]:
+            for w, t in tags:
+                if (t.startswith("NN") or t == "CD") and _is_word(w):
+                    counts[_answer_type(t)][w] += 1
+
+        raw_items = []
+        answers = {}
+        for sent, tags in zip(sents, data["tagged"]):
+            found = _extract_candidate(tags)
+            if not found:
+                continue
+            answer, tag = found
+            kind = _answer_type(tag)
+            answers.setdefault(answer.lower(), (answer, kind))
+            raw_items.append((sent, answer, kind))
+
+        distractors = None
+        if model_name and answers:
+            try:
+                distractors = cls._embedding_distractors(answers, counts, model_name)
+            except Exception:
+                # no model available: frequency ranking still gives usable options
+                distractors = None
+        if distractors is None:
+            distractors = cls._frequency_distractors(answers, counts)
+
+        items = []
+        for sent, answer, kind in raw_items:
+            items.append({
+                "sentence": sent,
+                # question: replace answer in sentence with blank
+                "question": re.sub(re.escape(answer), "_____", sent, flags=re.IGNORECASE),
+                "answer": answer,
+                "answer_type": kind,
+                "distractors": distractors.get(answer.lower(), []),
+            })
+
+        return cls(items, cls.completion_fallbacks(sents))
+
+    @staticmethod
+    def completion_fallbacks(sents: List[str]) -> List[dict]:
+        # If insufficient items, fall back to simple sentence truncation questions
+        fallbacks = []
         for s in sents:
-            if len(quiz) >= num_questions:
-                break
             words = s.split()
             if len(words) > 8:
-                answer = words[min(2, len(words)-1)]
-                options = [answer, answer + "X", answer + "Y", answer + "Z"]
-                random.shuffle(options)
-                quiz.append({"question": "Complete: " + " ".join(words[:6]) + " ...", "options": options, "answer_index": options.index(answer)})
-    return quiz[:num_questions]
+                fallbacks.append({"question": "Complete: " + " ".join(words[:6]) + " ...",
+                                  "answer": words[min(2, len(words)-1)]})
+        return fallbacks
+
+    @classmethod
+    def _frequency_distractors(cls, answers: dict, counts: dict) -> dict:
+        # same answer type first, topped up from the whole pool, most frequent first
+        ranked_pool = {kind: [w for w, _ in c.most_common()] for kind, c in counts.items()}
+        overall = [w for w, _ in (counts["number"] + counts["proper_noun"] + counts["noun"]).most_common()]
+        out = {}
+        for key, (answer, kind) in answers.items():
+            ranked, seen = [], {key}
+            for source in (ranked_pool[kind], overall):
+                for w in source:
+                    if len(ranked) >= cls.NUM_DISTRACTORS:
+                        break
+                    if w.lower() not in seen:
+                        seen.add(w.lower())
+                        ranked.append(w)
+            out[key] = ranked
+        return out
+
+    @classmethod
+    def _embedding_distractors(cls, answers: dict, counts: dict, model_name: str) -> dict:
+        """
+        Rank distractors by cosine similarity to the answer. The document vocabulary
+        is embedded once with the shared model, then all answers are ranked against
+        it with blocked matrix products; nothing is encoded per question.
+        """
+        # one surface form and type per lowercase term: its most frequent one
+        best = {}
+        for kind, c in counts.items():
+            for w, n in c.items():
+                key = w.lower()
+                if key not in best or n > best[key][1]:
+                    best[key] = (w, n, kind)
+        totals = Counter()
+        for kind, c in counts.items():
+            for w, n in c.items():
+                totals[w.lower()] += n
+        keys = [k for k, _ in totals.most_common(QUIZ_VOCAB_MAX)]
+        in_vocab = set(keys)
+        keys += [k for k in answers if k not in in_vocab]
+        if len(keys) < 2:
+            return {}
+        words = [best[k][0] if k in best else answers[k][0] for k in keys]
+        kinds = [best[k][2] if k in best else answers[k][1] for k in keys]
+        index_of = {k: i for i, k in enumerate(keys)}
+
+        vocab = get_model(model_name).encode(words, batch_size=256, show_progress_bar=False,
+                                             convert_to_numpy=True, normalize_embeddings=True).astype(np.float32)
+        type_ids = {"number": 0, "proper_noun": 1, "noun": 2}
+        vocab_types = np.array([type_ids[k] for k in kinds])
+
+        answer_keys = list(answers)
+        rows = np.array([index_of[k] for k in answer_keys])
+        answer_types = np.array([type_ids[answers[k][1]] for k in answer_keys])
+        num_cand = min(cls.NUM_DISTRACTORS * 3, len(keys) - 1)
+        out = {}
+        for b in range(0, len(rows), 512):
+            r = rows[b:b + 512]
+            sims = vocab[r] @ vocab.T
+            # same answer type ranks above any other type
+            sims += (vocab_types[None, :] == answer_types[b:b + 512, None])
+            sims[np.arange(len(r)), r] = -np.inf
+            top = np.argpartition(-sims, num_cand - 1, axis=1)[:, :num_cand]
+            order = np.take_along_axis(sims, top, axis=1).argsort(axis=1)[:, ::-1]
+            top = np.take_along_axis(top, order, axis=1)
+            for key, cand in zip(answer_keys[b:b + 512], top):
+                ranked = []
+                for j in cand:
+                    other = keys[j]
+                    # skip inflections of the answer itself (process / processes)
+                    if other.startswith(key) or key.startswith(other):
+                        continue
+                    ranked.append(words[j])
+                    if len(ranked) >= cls.NUM_DISTRACTORS:
+                        break
+                out[key] = ranked
+        return out
+
+    def sample(self, num_questions: int = 5, rng: random.Random = None) -> List[dict]:
+        """Draw a quiz of num_questions with distinct answers; cost depends on num_questions only."""
+        return list(self.iter_sample(num_questions, rng))
+
+    def iter_sample(self, num_questions: int = 5, rng: random.Random = None) -> Iterator[dict]:
+        """sample() one question at a time, for streaming responses."""
+        rng = rng or random
+        produced = 0
+        # k distinct answers, then one of their sentences each: O(k), and never fewer
+        # real questions than the bank has distinct answers
+        k = min(num_questions, len(self.answer_keys))
+        for key in rng.sample(self.answer_keys, k):
+            produced += 1
+            yield self._render(self.items[rng.choice(self.by_answer[key])], rng)
+        for fb in self.fallbacks:
+            if produced >= num_questions:
+                break
+            produced += 1
+            yield self._render_fallback(fb, rng)
+
+    @staticmethod
+    def _render_fallback(fb: dict, rng) -> dict:
+        answer = fb["answer"]
+        options = [answer, answer + "X", answer + "Y", answer + "Z"]
+        rng.shuffle(options)
+        return {"question": fb["question"], "options": options, "answer_index": options.index(answer)}
+
+    @staticmethod
+    def _render(item: dict, rng) -> dict:
+        answer = item["answer"]
+        # build options: correct + 3 of the top-ranked distractors
+        ranked = item["distractors"]
+        distractors = rng.sample(ranked[:6], min(3, len(ranked[:6])))
+        # fallback: generate simple numeric distractors if the pool is too small
+        while len(distractors) < 3:
+            distractors.append(answer + str(rng.randint(1, 9)))
+        options = [answer] + distractors
+        rng.shuffle(options)
+        return {"question": item["question"], "options": options, "answer_index": options.index(answer)}
+
+def _window_bounds(text: str, window_chars: int) -> List[int]:
+    """
+    Offsets cutting text into windows of at least window_chars. Each cut moves on to
+    the next sentence end, so no sentence is split; text without one within another
+    window (e.g. no punctuation) is cut at the next whitespace instead.
+    """
+    bounds = [0]
+    pos = window_chars
+    while pos < len(text):
+        m = _SENT_END.search(text, pos, pos + window_chars) or _SPACE.search(text, pos, pos + window_chars)
+        cut = m.end() if m else pos + window_chars
+        if cut >= len(text):
+            break
+        bounds.append(cut)
+        pos = cut + window_chars
+    bounds.append(len(text))
+    return bounds
+
+def _tag_window(sents: List[str]) -> QuizBank:
+    return QuizBank.build(None, data={"sents": sents, "tagged": tag_sentences(sents, workers=1)})
+
+def _take_fresh(bank: QuizBank, used: set, limit: int, rng) -> Iterator[dict]:
+    # questions on answers no earlier window asked about
+    fresh = [k for k in bank.answer_keys if k not in used]
+    for key in rng.sample(fresh, max(0, min(limit, len(fresh)))):
+        used.add(key)
+        yield bank._render(bank.items[rng.choice(bank.by_answer[key])], rng)
+
+def iter_quiz_incremental(text: str, num_questions: int = 5, rng: random.Random = None,
+                          window_chars: int = None, max_windows: int = None) -> Iterator[dict]:
+    """
+    Stream a quiz without the document's QuizBank: random windows of the text are
+    tagged one at a time and each yields its questions as soon as it is tagged, so
+    the first question costs one window instead of the whole bank build.
+    Distractors come from the window's own terms (frequency ranking). At most
+    max_windows windows are tagged; completion questions, which need no tagging,
+    come from every window, so the quiz is no shorter than the bank's would be.
+    The same text and rng seed always give the same quiz.
+    """
+    rng = rng or random
+    window_chars = window_chars or QUIZ_STREAM_WINDOW
+    max_windows = max(1, max_windows or QUIZ_STREAM_MAX_WINDOWS)
+    bounds = _window_bounds(text, window_chars)
+    num_windows = len(bounds) - 1
+    order = rng.sample(range(num_windows), num_windows)
+    sents = {}
+
+    def window_sents(w):
+        if w not in sents:
+            sents[w] = sent_tokenize(text[bounds[w]:bounds[w + 1]])
+        return sents[w]
+
+    # spread questions over the document: few per window on the first pass
+    per_window = num_questions if num_windows == 1 else max(1, -(-num_questions // 4))
+    produced = 0
+    used = set()
+    banks = []
+    for w in order[:max_windows]:
+        if produced >= num_questions:
+            return
+        banks.append(_tag_window(window_sents(w)))
+        for item in _take_fresh(banks[-1], used, min(per_window, num_questions - produced), rng):
+            produced += 1
+            yield item
+    # top up from the windows already tagged
+    for bank in banks:
+        for item in _take_fresh(bank, used, num_questions - produced, rng):
+            produced += 1
+            yield item
+    # then completion questions: those of the tagged windows, then of the others
+    fallbacks = [fb for bank in banks for fb in bank.fallbacks]
+    for w in order[max_windows:]:
+        if produced + len(fallbacks) >= num_questions:
+            break
+        fallbacks += QuizBank.completion_fallbacks(window_sents(w))
+    for fb in fallbacks[:max(0, num_questions - produced)]:
+        produced += 1
+        yield QuizBank._render_fallback(fb, rng)
+    # still short (few, short sentences): tag the remaining windows after all
+    for w in order[max_windows:]:
+        if produced >= num_questions:
+            return
+        for item in _take_fresh(_tag_window(window_sents(w)), used, num_questions - produced, rng):
+            produced += 1
+            yield item
+
+def generate_quiz_from_text(text: str, num_questions: int = 5, bank: QuizBank = None,
+                            model_name: str = None, seed: int = None):
+    # request-local RNG: the same seed and document always give the same quiz
+    if bank is None:
+        bank = QuizBank.build(text, model_name=model_name)
+    return bank.sample(num_questions, rng=random.Random(seed))
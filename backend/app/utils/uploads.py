@@ -0,0 +1,96 @@
+# backend/utils/uploads.py
+import hashlib
+from pathlib import Path
+from typing import AsyncIterator, Tuple
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def _import_multipart():
+    try:
+        from python_multipart.multipart import MultipartParser, parse_options_header
+    except ImportError:
+        try:
+            # python-multipart before 0.0.13
+            from multipart.multipart import MultipartParser, parse_options_header
+        except ImportError:
+            raise RuntimeError("python-multipart required for uploads (pip install python-multipart)")
+    return MultipartParser, parse_options_header
+
+
+async def receive_file(body: AsyncIterator[bytes], content_type: str, dest: Path, max_bytes: int,
+                       field: str = "file") -> Tuple[str, str, int]:
+    """
+    Parse a multipart/form-data body as it arrives and write the `field` file part
+    to dest, hashing it in the same pass. Returns (filename, sha256 hex, size).
+    Raises UploadTooLarge as soon as the file (or the whole body) passes max_bytes,
+    whether or not the request declared a Content-Length, and ValueError for a
+    body that is not multipart or has no such file part.
+    """
+    MultipartParser, parse_options_header = _import_multipart()
+    ctype, params = parse_options_header(content_type or "")
+    boundary = params.get(b"boundary")
+    if ctype != b"multipart/form-data" or not boundary:
+        raise ValueError("expected a multipart/form-data body")
+
+    hasher = hashlib.sha256()
+    state = {"size": 0, "filename": None, "writing": False}
+    headers = {}
+    header = [b"", b""]
+
+    with open(dest, "wb") as f:
+        def on_part_begin():
+            headers.clear()
+
+        def on_header_field(data, start, end):
+            header[0] += data[start:end]
+
+        def on_header_value(data, start, end):
+            header[1] += data[start:end]
+
+        def on_header_end():
+            headers[header[0].strip().lower()] = header[1]
+            header[0] = header[1] = b""
+
+        def on_headers_finished():
+            _, disposition = parse_options_header(headers.get(b"content-disposition", b""))
+            name = disposition.get(b"name", b"").decode("utf-8", "replace")
+            filename = disposition.get(b"filename")
+            # the first file part with the expected name; other fields are skipped
+            state["writing"] = name == field and filename is not None and state["filename"] is None
+            if state["writing"]:
+                state["filename"] = Path(filename.decode("utf-8", "replace").replace("\\", "/")).name or "upload"
+
+        def on_part_data(data, start, end):
+            if not state["writing"]:
+                return
+            block = data[start:end]
+            state["size"] += len(block)
+            if state["size"] > max_bytes:
+                raise UploadTooLarge()
+            hasher.update(block)
+            f.write(block)
+
+        def on_part_end():
+            state["writing"] = False
+
+        parser = MultipartParser(boundary, {
+            "on_part_begin": on_part_begin, "on_header_field": on_header_field,
+            "on_header_value": on_header_value, "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished, "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        })
+        received = 0
+        async for chunk in body:
+            received += len(chunk)
+            # room for the multipart framing and small form fields, no more
+            if received > max_bytes + 64 * 1024:
+                raise UploadTooLarge()
+            parser.write(chunk)
+        parser.finalize()
+
+    if state["filename"] is None:
+        raise ValueError(f"no '{field}' file in the upload")
+    return state["filename"], hasher.hexdigest(), state["size"]
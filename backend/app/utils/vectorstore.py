@@ -1,22 +1,39 @@
 # backend/utils/qa_utils.py
+import asyncio
+import json
 import os
-from typing import List, Tuple
-from .embedder import EmbeddingIndex
+import numpy as np
+from typing import AsyncIterator, List, Optional, Tuple
+from .chunker import ChunkTable
+from .cache import LRUCache, SemanticCache
+from .embedder import EmbeddingIndex, normalize_query
+from .genclient import GEN_CLIENT
 
 HF_TOKEN = os.environ.get("HF_API_TOKEN", None)
 GEN_MODEL = os.environ.get("amazon/nova-2-lite-v1", None)  # e.g. "amazon/nova-2-lite-v1"
 
-def _call_hf_generation(prompt: str, model: str, token: str, max_tokens: int = 256) -> str:
-    import requests
-    headers = {"Authorization": f"Bearer {token}"}
-    url = f"https://api-inference.huggingface.co/models/{model}"
+# two-level answer cache, both levels LRU with a TTL:
+# ANSWER_CACHE: (doc hash, normalized question, top_k) -> (answer, used chunks); skips everything
+# GENERATION_CACHE: (doc hash, sorted chunk ids, normalized question) -> generated answer;
+#   skips the remote call whenever the same question meets the same context again
+#   (another top_k, or /query vs /query/stream)
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", 3600))
+ANSWER_CACHE = LRUCache(maxsize=int(os.environ.get("ANSWER_CACHE_SIZE", 1024)), ttl=ANSWER_CACHE_TTL)
+GENERATION_CACHE = LRUCache(maxsize=int(os.environ.get("GENERATION_CACHE_SIZE", 1024)), ttl=ANSWER_CACHE_TTL)
+# paraphrases ("what is osmosis" / "define osmosis"): answers keyed on the query embedding,
+# served when a new question is at least SEMANTIC_CACHE_THRESHOLD cosine-similar to a cached
+# one (SEMANTIC_CACHE_SIZE=0 disables it)
+SEMANTIC_CACHE = SemanticCache(maxsize=int(os.environ.get("SEMANTIC_CACHE_SIZE", 512)),
+                               threshold=float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", 0.92)),
+                               ttl=ANSWER_CACHE_TTL)
+
+async def _call_hf_generation(prompt: str, model: str, token: str, max_tokens: int = 256) -> str:
     payload = {
         "inputs": prompt,
         "parameters": {"max_new_tokens": max_tokens, "temperature": 0.2, "top_k":50}
     }
-    resp = requests.post(url, headers=headers, json=payload, timeout=30)
-    resp.raise_for_status()
-    out = resp.json()
+    # pooled keep-alive client shared across requests (see genclient.py)
+    out = await GEN_CLIENT.post_json(model, payload, token=token)
     # inference API may return text in different formats
     if isinstance(out, dict) and "error" in out:
         raise RuntimeError(out["error"])
@@ -27,33 +44,172 @@ def _call_hf_generation(prompt: str, model: str, token: str, max_tokens: int = 2
         return out[0].get("generated_text", str(out[0]))
     return str(out)
 
-def answer_question_from_context(question: str, chunks: List[str], index: EmbeddingIndex, top_k=5) -> Tuple[str, List[dict]]:
-    """
-    Retrieve top K chunks and either return concatenated chunks (extractive)
-    or call generation model with prompt+context if HF_TOKEN+GEN_MODEL provided.
-    """
-    results = index.query(question, top_k=top_k)
+async def _stream_hf_generation(prompt: str, model: str, token: str, max_tokens: int = 256) -> AsyncIterator[str]:
+    """Yield generated text pieces as the inference server emits them (server-sent events)."""
+    payload = {
+        "inputs": prompt,
+        "parameters": {"max_new_tokens": max_tokens, "temperature": 0.2, "top_k":50},
+        "stream": True
+    }
+    async for line in GEN_CLIENT.stream_lines(model, payload, token=token):
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if not data or data == "[DONE]":
+            continue
+        out = json.loads(data)
+        if isinstance(out, dict) and "error" in out:
+            raise RuntimeError(out["error"])
+        tok = out.get("token") or {}
+        if tok.get("special"):
+            continue
+        if tok.get("text"):
+            yield tok["text"]
+
+def _build_prompt(question: str, context: str) -> str:
+    return (
+        "You are a helpful assistant. Use the CONTEXT to answer the QUESTION succinctly.\n\n"
+        f"CONTEXT:\n{context}\n\nQUESTION: {question}\n\nAnswer:"
+    )
+
+def _extractive_answer(context_texts: List[str]) -> str:
+    # default: extractive answer by returning the top chunk(s)
+    return context_texts[0] if len(context_texts) > 0 else "No relevant information found."
+
+async def retrieve_context(question: str, index: EmbeddingIndex, top_k=5,
+                           q_emb: Optional[np.ndarray] = None) -> Tuple[List[dict], List[str]]:
+    """Top K chunks for the question (or its precomputed embedding), with their source location when known."""
+    # retrieval is CPU-bound (query encoding + search): keep it off the event loop
+    if q_emb is None:
+        q_emb = await asyncio.to_thread(index.encode_query, question)
+    results = await asyncio.to_thread(index.query_vector, q_emb, top_k)
     used = []
     context_texts = []
     for idx, score, text in results:
-        used.append({"idx": idx, "score": score, "text": text})
+        entry = {"idx": idx, "score": score, "text": text}
+        if isinstance(index.texts, ChunkTable):
+            # source location: character span in the document and starting page
+            entry.update(index.texts.span(idx))
+        used.append(entry)
         context_texts.append(text)
+    return used, context_texts
+
+def _generation_key(doc_hash: str, used: List[dict], question: str):
+    return (doc_hash, tuple(sorted(u["idx"] for u in used)), normalize_query(question))
+
+async def _lookup_answer(question: str, index: EmbeddingIndex, top_k: int, doc_hash: Optional[str]):
+    """
+    (cached, answer_key, q_emb): the cached (answer, used, generated) from the exact
+    or the semantic cache, or None. q_emb is computed for the semantic lookup and
+    reused for retrieval on a miss.
+    """
+    answer_key = (doc_hash, normalize_query(question), top_k)
+    if doc_hash is None:
+        return None, answer_key, None
+    cached = ANSWER_CACHE.get(answer_key)
+    if cached is not None:
+        return cached, answer_key, None
+    q_emb = await asyncio.to_thread(index.encode_query, question)
+    cached = SEMANTIC_CACHE.get((doc_hash, index.model_name, top_k), q_emb)
+    if cached is not None:
+        # a paraphrase of this question next time is an exact hit
+        ANSWER_CACHE.put(answer_key, cached)
+    return cached, answer_key, q_emb
+
+def _remember(answer_key, index: EmbeddingIndex, q_emb: np.ndarray, value: tuple):
+    doc_hash, _, top_k = answer_key
+    if doc_hash is None or not value[0]:
+        return
+    ANSWER_CACHE.put(answer_key, value)
+    SEMANTIC_CACHE.put((doc_hash, index.model_name, top_k), q_emb, value)
+
+async def answer_question_from_context(question: str, chunks: List[str], index: EmbeddingIndex, top_k=5,
+                                       doc_hash: Optional[str] = None) -> Tuple[str, List[dict]]:
+    """
+    Retrieve top K chunks and either return concatenated chunks (extractive)
+    or call generation model with prompt+context if HF_TOKEN+GEN_MODEL provided.
+    With doc_hash, answers are served from and stored in the answer caches.
+    """
+    cached, answer_key, q_emb = await _lookup_answer(question, index, top_k, doc_hash)
+    if cached is not None:
+        return cached[0], cached[1]
+
+    used, context_texts = await retrieve_context(question, index, top_k, q_emb=q_emb)
 
     context = "\n\n".join(context_texts)
     # If user provided HF token and model, call the model to generate answer (optional)
     if HF_TOKEN and GEN_MODEL:
-        prompt = (
-            "You are a helpful assistant. Use the CONTEXT to answer the QUESTION succinctly.\n\n"
-            f"CONTEXT:\n{context}\n\nQUESTION: {question}\n\nAnswer:"
-        )
-        try:
-            gen = _call_hf_generation(prompt, GEN_MODEL, HF_TOKEN, max_tokens=256)
-            return gen.strip(), used
-        except Exception as e:
-            # fallback to extractive
-            return (f"(generation failed: {e})\n\n" + context_texts[0], used)
+        gen_key = _generation_key(doc_hash, used, question)
+        gen = GENERATION_CACHE.get(gen_key) if doc_hash is not None else None
+        if gen is None:
+            prompt = _build_prompt(question, context)
+            try:
+                gen = (await _call_hf_generation(prompt, GEN_MODEL, HF_TOKEN, max_tokens=256)).strip()
+                if not gen:
+                    raise RuntimeError("empty generation")
+            except Exception as e:
+                # fallback to extractive (not cached: the failure may be transient)
+                return (f"(generation failed: {e})\n\n" + _extractive_answer(context_texts), used)
+            if doc_hash is not None:
+                GENERATION_CACHE.put(gen_key, gen)
+        _remember(answer_key, index, q_emb, (gen, used, True))
+        return gen, used
 
-    # default: extractive answer by returning the top chunk(s)
-    short_answer = context_texts[0] if len(context_texts) > 0 else "No relevant information found."
-    # for better answer, include small synth: list top sentences in top chunk
-    return short_answer, used
+    answer = _extractive_answer(context_texts)
+    _remember(answer_key, index, q_emb, (answer, used, False))
+    return answer, used
+
+async def stream_answer_from_context(question: str, index: EmbeddingIndex, top_k=5,
+                                     doc_hash: Optional[str] = None) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    answer_question_from_context as a stream of (event, data) pairs:
+    "context" with the retrieved chunks, then "token" per generated piece, then
+    "done" with the full answer. If generation is not configured or fails (even
+    mid-stream) a "fallback" event carries the extractive answer before "done".
+    A cached generated answer arrives as a single "token" event.
+    """
+    cached, answer_key, q_emb = await _lookup_answer(question, index, top_k, doc_hash)
+    if cached is not None:
+        answer, used, generated = cached
+        yield "context", {"used_chunks": used}
+        yield ("token", {"text": answer}) if generated else ("fallback", {"answer": answer, "error": None})
+        yield "done", {"answer": answer, "generated": generated}
+        return
+
+    used, context_texts = await retrieve_context(question, index, top_k, q_emb=q_emb)
+    yield "context", {"used_chunks": used}
+
+    if HF_TOKEN and GEN_MODEL:
+        gen_key = _generation_key(doc_hash, used, question)
+        gen = GENERATION_CACHE.get(gen_key) if doc_hash is not None else None
+        if gen is not None:
+            yield "token", {"text": gen}
+        else:
+            pieces = []
+            try:
+                async for piece in _stream_hf_generation(_build_prompt(question, "\n\n".join(context_texts)), GEN_MODEL, HF_TOKEN, max_tokens=256):
+                    pieces.append(piece)
+                    yield "token", {"text": piece}
+                # a non-SSE body or a stream without tokens yields nothing: not an answer
+                gen = "".join(pieces).strip()
+                if not gen:
+                    raise RuntimeError("empty generation")
+            except Exception as e:
+                # tokens already sent are discarded by the client on "fallback"
+                answer = _extractive_answer(context_texts)
+                yield "fallback", {"answer": answer, "error": str(e)}
+                yield "done", {"answer": answer, "generated": False}
+                return
+            if doc_hash is not None:
+                GENERATION_CACHE.put(gen_key, gen)
+        _remember(answer_key, index, q_emb, (gen, used, True))
+        yield "done", {"answer": gen, "generated": True}
+        return
+
+    answer = _extractive_answer(context_texts)
+    _remember(answer_key, index, q_emb, (answer, used, False))
+    yield "fallback", {"answer": answer, "error": None}
+    yield "done", {"answer": answer, "generated": False}
+
+def answer_cache_stats() -> dict:
+    return {"answers": ANSWER_CACHE.stats(), "semantic": SEMANTIC_CACHE.stats(), "generated": GENERATION_CACHE.stats()}
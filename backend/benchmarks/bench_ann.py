@@ -0,0 +1,69 @@
+# backend/benchmarks/bench_ann.py
+"""
+Recall@k and query latency of the FAISS backends (flat, ivf, hnsw) against the
+NumPy brute-force index, on synthetic clustered unit vectors shaped like MiniLM
+chunk embeddings (384-d).
+
+    cd backend
+    python -m benchmarks.bench_ann [--sizes 10000 100000 1000000] [--k 5]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.utils.ann import BruteForceIndex, FaissIndex
+
+
+def make_corpus(n: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    # points scattered around a few hundred topic centroids, like chunk embeddings
+    centroids = rng.standard_normal((256, dim)).astype(np.float32)
+    x = centroids[rng.integers(0, len(centroids), n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    return x
+
+
+def make_queries(corpus: np.ndarray, n: int, rng: np.random.Generator, noise: float = 0.3) -> np.ndarray:
+    # perturbed corpus rows: queries fall in the same topic clusters as the chunks,
+    # as real questions about the document do
+    q = corpus[rng.integers(0, len(corpus), n)] + noise / np.sqrt(corpus.shape[1]) * rng.standard_normal((n, corpus.shape[1])).astype(np.float32)
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    return q
+
+
+def run(index, queries: np.ndarray, k: int):
+    ids, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, idxs = index.search(q, k)
+        latencies.append(time.perf_counter() - start)
+        ids.append(set(idxs.tolist()))
+    return ids, np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"{'chunks':>9} {'backend':>7} {'build s':>8} {'recall@' + str(args.k):>9} {'p50 ms':>7} {'p99 ms':>7}")
+    for n in args.sizes:
+        corpus = make_corpus(n, args.dim, rng)
+        queries = make_queries(corpus, args.queries, rng)
+        exact_ids, exact_ms = run(BruteForceIndex(corpus), queries, args.k)
+        print(f"{n:>9} {'numpy':>7} {0.0:>8.2f} {1.0:>9.3f} {np.percentile(exact_ms, 50):>7.3f} {np.percentile(exact_ms, 99):>7.3f}")
+        for kind in ("flat", "ivf", "hnsw"):
+            start = time.perf_counter()
+            index = FaissIndex.build(corpus, kind)
+            build_s = time.perf_counter() - start
+            ids, ms = run(index, queries, args.k)
+            recall = np.mean([len(a & b) / args.k for a, b in zip(ids, exact_ids)])
+            print(f"{n:>9} {kind:>7} {build_s:>8.2f} {recall:>9.3f} {np.percentile(ms, 50):>7.3f} {np.percentile(ms, 99):>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# backend/benchmarks/bench_pdf_extract.py
+"""
+Serial vs process-pool PDF extraction on 100, 500 and 1000 page documents.
+The documents are built by repeating the pages of a source PDF.
+
+    cd backend
+    python -m benchmarks.bench_pdf_extract [source.pdf] [--workers N]
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from app.utils.extractor import _read_pdf
+
+PAGE_COUNTS = (100, 500, 1000)
+
+
+def build_pdf(source: Path, num_pages: int, dest: Path):
+    import PyPDF2
+    reader = PyPDF2.PdfReader(str(source))
+    writer = PyPDF2.PdfWriter()
+    for i in range(num_pages):
+        writer.add_page(reader.pages[i % len(reader.pages)])
+    with open(dest, "wb") as f:
+        writer.write(f)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return time.perf_counter() - start, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", nargs="?", help="PDF to repeat (default: first PDF in uploads/)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    source = Path(args.source) if args.source else next(Path("uploads").glob("*.pdf"), None)
+    if source is None:
+        raise SystemExit("No source PDF given and none found in uploads/")
+
+    print(f"source={source.name} workers={args.workers}")
+    print(f"{'pages':>6} {'serial s':>10} {'parallel s':>11} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in PAGE_COUNTS:
+            pdf = Path(tmp) / f"bench_{n}.pdf"
+            build_pdf(source, n, pdf)
+            t_serial, serial_text = timed(_read_pdf, pdf, workers=1)
+            t_parallel, parallel_text = timed(_read_pdf, pdf, workers=args.workers)
+            assert serial_text == parallel_text, "parallel extraction changed the page order"
+            print(f"{n:>6} {t_serial:>10.2f} {t_parallel:>11.2f} {t_serial / t_parallel:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# backend/benchmarks/bench_pos_tag.py
+"""
+Sentences per second for POS tagging in three modes: one pos_tag call per
+sentence (the old quiz path), batched pos_tag_sents, and batches spread over a
+process pool.
+
+    cd backend
+    python -m benchmarks.bench_pos_tag [text_file] [--sentences 20000] [--workers N]
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+
+from nltk import pos_tag, sent_tokenize, word_tokenize
+
+from app.utils.quizmaker import tag_sentences
+
+SAMPLE = (
+    "The operating system schedules 4 processes using Round Robin. "
+    "Memory management allocates pages to each process in the Linux kernel. "
+    "DevOps teams use Jenkins and Docker to automate deployment pipelines. "
+    "Photosynthesis converts light energy into chemical energy in chloroplasts. "
+)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("text_file", nargs="?", help="document to tag (default: repeated sample text)")
+    parser.add_argument("--sentences", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--serial-limit", type=int, default=2000,
+                        help="tag at most this many sentences in per-sentence mode (it is slow)")
+    args = parser.parse_args()
+
+    text = Path(args.text_file).read_text(encoding="utf-8", errors="ignore") if args.text_file else SAMPLE
+    sents = sent_tokenize(text)
+    while len(sents) < args.sentences:
+        sents = sents + sents
+    sents = sents[:args.sentences]
+
+    def rate(fn, items):
+        start = time.perf_counter()
+        fn(items)
+        return len(items) / (time.perf_counter() - start)
+
+    serial = rate(lambda xs: [pos_tag(word_tokenize(s)) for s in xs], sents[:args.serial_limit])
+    batched = rate(lambda xs: tag_sentences(xs, workers=1), sents)
+    parallel = rate(lambda xs: tag_sentences(xs, workers=args.workers), sents)
+    print(f"sentences={len(sents)} workers={args.workers}")
+    print(f"{'per-sentence':>13}: {serial:>10.0f} sent/s")
+    print(f"{'batched':>13}: {batched:>10.0f} sent/s ({batched / serial:.1f}x)")
+    print(f"{'parallel':>13}: {parallel:>10.0f} sent/s ({parallel / serial:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
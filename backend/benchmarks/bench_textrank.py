@@ -0,0 +1,81 @@
+# backend/benchmarks/bench_textrank.py
+"""
+sumy TextRank vs the vectorized engine (summarize_textrank method="vector") on
+documents of 1k, 10k and 50k sentences. The vector timings are split into
+sentence encoding and graph + PageRank, since encoding dominates on CPU.
+
+sumy's graph is quadratic in the sentence count, so by default it only runs up to
+--sumy-max sentences; larger sizes show a quadratic extrapolation from the largest
+measured run, marked "~". For the measured 50k comparison (takes hours):
+
+    cd backend
+    python -m benchmarks.bench_textrank [text_file] [--sizes 1000 10000 50000] [--sumy-max 50000]
+"""
+import argparse
+import time
+from pathlib import Path
+
+import nltk
+import numpy as np
+
+from app.utils.generation import summarize_textrank, textrank_scores
+from app.utils.model_registry import get_model
+
+SAMPLE = (
+    "The operating system schedules processes using Round Robin. "
+    "Memory management allocates pages to each process. "
+    "DevOps teams use Jenkins and Docker to automate deployment pipelines. "
+    "Continuous integration runs the test suite on every commit. "
+    "Photosynthesis converts light energy into chemical energy. "
+)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("text_file", nargs="?", help="document to repeat (default: sample text)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--sentences-count", type=int, default=8)
+    parser.add_argument("--sumy-max", type=int, default=10000,
+                        help="estimate sumy above this many sentences instead of running it (hours at 50k)")
+    args = parser.parse_args()
+
+    text = Path(args.text_file).read_text(encoding="utf-8", errors="ignore") if args.text_file else SAMPLE
+    base = nltk.sent_tokenize(text)
+    model = get_model()
+
+    print(f"{'sentences':>9} {'sumy s':>9} {'encode s':>9} {'graph+pr s':>10} {'vector s':>9} {'speedup':>8}")
+    measured = None  # (sentences, seconds) of the largest sumy run, for extrapolation
+    for n in sorted(args.sizes):
+        sents = (base * (n // len(base) + 1))[:n]
+        # vary sentences so the graph is not made of exact duplicates
+        sents = [f"{s} (section {i // len(base)})" for i, s in enumerate(sents)]
+        doc = " ".join(sents)
+
+        sumy_s = None
+        if n <= args.sumy_max:
+            start = time.perf_counter()
+            summarize_textrank(doc, args.sentences_count, method="sumy")
+            sumy_s = time.perf_counter() - start
+            measured = (n, sumy_s)
+
+        start = time.perf_counter()
+        emb = model.encode(sents, batch_size=64, show_progress_bar=False,
+                           convert_to_numpy=True, normalize_embeddings=True)
+        encode_s = time.perf_counter() - start
+        start = time.perf_counter()
+        textrank_scores(np.asarray(emb, dtype=np.float32))
+        graph_s = time.perf_counter() - start
+        vector_s = encode_s + graph_s
+
+        if sumy_s is not None:
+            sumy_col, speedup = f"{sumy_s:>9.2f}", f"{sumy_s / vector_s:>7.1f}x"
+        elif measured is not None:
+            est = measured[1] * (n / measured[0]) ** 2
+            sumy_col, speedup = f"{'~%.0f' % est:>9}", f"{'~%.0f' % (est / vector_s):>7}x"
+        else:
+            sumy_col, speedup = f"{'skipped':>9}", f"{'-':>8}"
+        print(f"{n:>9} {sumy_col} {encode_s:>9.2f} {graph_s:>10.2f} {vector_s:>9.2f} {speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# backend/tests/test_genclient.py
+"""
+GenerationClient and the generation path of answer_question_from_context, run
+against a local stand-in inference server (no network). Run from backend/:
+python -m pytest -q tests
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import numpy as np
+import pytest
+
+from app.utils import vectorstore
+from app.utils.genclient import GenerationClient
+
+
+class _InferenceHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so connections stay open between requests
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests.append({"path": self.path, "peer": self.client_address, "body": body,
+                                    "auth": self.headers.get("Authorization")})
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if self.path.startswith("/slow"):
+                time.sleep(0.2)
+            if body.get("stream") and self.path.startswith("/sse"):
+                # text-generation-inference style server-sent events
+                events = [{"token": {"text": t, "special": False}} for t in ("stand-in", " answer")]
+                events.append({"token": {"text": "</s>", "special": True}, "generated_text": "stand-in answer"})
+                payload = "".join(f"data:{json.dumps(e)}\n\n" for e in events).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+            if self.path.startswith("/error"):
+                out = {"error": "Model is currently loading"}
+            else:
+                out = [{"generated_text": "stand-in answer"}]
+            payload = json.dumps(out).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _InferenceHandler)
+    srv.daemon_threads = True
+    srv.lock = threading.Lock()
+    srv.requests = []
+    srv.in_flight = 0
+    srv.max_in_flight = 0
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    srv.url = f"http://127.0.0.1:{srv.server_address[1]}"
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _run(coro_fn, client):
+    async def main():
+        try:
+            return await coro_fn()
+        finally:
+            await client.aclose()
+    return asyncio.run(main())
+
+
+def test_post_json_success(server):
+    client = GenerationClient(base_url=server.url)
+    out = _run(lambda: client.post_json("ok-model", {"inputs": "hi"}, token="secret"), client)
+    assert out == [{"generated_text": "stand-in answer"}]
+    assert server.requests[0]["path"] == "/ok-model"
+    assert server.requests[0]["body"] == {"inputs": "hi"}
+    assert server.requests[0]["auth"] == "Bearer secret"
+
+
+def test_connection_is_reused(server):
+    client = GenerationClient(base_url=server.url)
+
+    async def calls():
+        for _ in range(5):
+            await client.post_json("ok-model", {"inputs": "hi"})
+
+    _run(calls, client)
+    assert len(server.requests) == 5
+    # one keep-alive connection: every request came from the same client port
+    assert len({r["peer"] for r in server.requests}) == 1
+
+
+def test_concurrency_limit(server):
+    client = GenerationClient(base_url=server.url, concurrency=2)
+
+    async def calls():
+        await asyncio.gather(*(client.post_json("slow-model", {"inputs": str(i)}) for i in range(6)))
+
+    started = time.perf_counter()
+    _run(calls, client)
+    assert len(server.requests) == 6
+    assert server.max_in_flight <= 2
+    # 6 requests of 0.2 s, two at a time
+    assert time.perf_counter() - started >= 0.55
+
+
+def test_timeout(server):
+    client = GenerationClient(base_url=server.url, timeout=0.05)
+    with pytest.raises(httpx.TimeoutException):
+        _run(lambda: client.post_json("slow-model", {"inputs": "hi"}), client)
+
+
+class _FakeIndex:
+    model_name = "stand-in"
+    texts = ["Osmosis is the movement of water across a membrane.", "Other chunk."]
+
+    def encode_query(self, question):
+        return np.array([1.0, 0.0], dtype=np.float32)
+
+    def query_vector(self, q_emb, top_k=5):
+        return [(0, 0.9, self.texts[0])]
+
+
+@pytest.fixture
+def generation(server, monkeypatch):
+    client = GenerationClient(base_url=server.url)
+    monkeypatch.setattr(vectorstore, "GEN_CLIENT", client)
+    monkeypatch.setattr(vectorstore, "HF_TOKEN", "secret")
+    return client
+
+
+def test_answer_uses_generation(server, generation, monkeypatch):
+    monkeypatch.setattr(vectorstore, "GEN_MODEL", "ok-model")
+    answer, used = _run(lambda: vectorstore.answer_question_from_context("what is osmosis?", None, _FakeIndex()),
+                        generation)
+    assert answer == "stand-in answer"
+    assert used[0]["idx"] == 0
+    assert "QUESTION: what is osmosis?" in server.requests[0]["body"]["inputs"]
+
+
+def test_error_json_falls_back_to_extractive(server, generation, monkeypatch):
+    monkeypatch.setattr(vectorstore, "GEN_MODEL", "error-model")
+    answer, used = _run(lambda: vectorstore.answer_question_from_context("what is osmosis?", None, _FakeIndex()),
+                        generation)
+    assert answer.startswith("(generation failed: Model is currently loading)")
+    assert answer.endswith(_FakeIndex.texts[0])
+
+
+def _stream_events(question, doc_hash=None):
+    async def collect():
+        return [e async for e in vectorstore.stream_answer_from_context(question, _FakeIndex(), doc_hash=doc_hash)]
+    return collect
+
+
+def test_stream_forwards_tokens(server, generation, monkeypatch):
+    monkeypatch.setattr(vectorstore, "GEN_MODEL", "sse-model")
+    events = _run(_stream_events("what is osmosis?"), generation)
+    assert [e for e, _ in events] == ["context", "token", "token", "done"]
+    assert events[-1][1] == {"answer": "stand-in answer", "generated": True}
+
+
+def test_stream_without_tokens_falls_back_and_is_not_cached(server, generation, monkeypatch):
+    # a plain JSON body has no "data:" lines, so no token arrives
+    monkeypatch.setattr(vectorstore, "GEN_MODEL", "ok-model")
+    monkeypatch.setattr(vectorstore, "ANSWER_CACHE", vectorstore.LRUCache(16))
+    monkeypatch.setattr(vectorstore, "GENERATION_CACHE", vectorstore.LRUCache(16))
+    monkeypatch.setattr(vectorstore, "SEMANTIC_CACHE", vectorstore.SemanticCache(16))
+    events = _run(_stream_events("what is osmosis?", doc_hash="doc"), generation)
+    assert [e for e, _ in events] == ["context", "fallback", "done"]
+    assert events[-1][1] == {"answer": _FakeIndex.texts[0], "generated": False}
+    assert len(vectorstore.ANSWER_CACHE) == 0
+    assert len(vectorstore.GENERATION_CACHE) == 0
@@ -0,0 +1,64 @@
+# backend/tests/test_uploads.py
+"""
+receive_file: the streaming multipart parser behind /upload, fed in small blocks
+as a chunked request body would arrive. Run from backend/: python -m pytest -q tests
+"""
+import asyncio
+import hashlib
+
+import pytest
+
+pytest.importorskip("python_multipart")
+
+from app.utils.uploads import UploadTooLarge, receive_file
+
+BOUNDARY = "----test-boundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def _body(payload: bytes, filename: str = "notes.txt") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nhello\r\n"
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: text/plain\r\n\r\n"
+    ).encode("utf-8") + payload + f"\r\n--{BOUNDARY}--\r\n".encode("utf-8")
+
+
+def _receive(body: bytes, dest, max_bytes: int, content_type: str = CONTENT_TYPE, block: int = 7):
+    async def stream():
+        for i in range(0, len(body), block):
+            yield body[i:i + block]
+    return asyncio.run(receive_file(stream(), content_type, dest, max_bytes))
+
+
+def test_file_part_written_and_hashed(tmp_path):
+    payload = b"osmosis " * 1000
+    dest = tmp_path / "upload.part"
+    filename, digest, size = _receive(_body(payload, filename="C:\\docs\\notes.txt"), dest, 1 << 20)
+    assert filename == "notes.txt"
+    assert size == len(payload)
+    assert digest == hashlib.sha256(payload).hexdigest()
+    assert dest.read_bytes() == payload
+
+
+def test_oversized_file_rejected_while_streaming(tmp_path):
+    received = []
+
+    async def endless():
+        yield _body(b"")[:-len(f"\r\n--{BOUNDARY}--\r\n")]
+        while True:
+            received.append(1)
+            yield b"x" * 1024
+
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(receive_file(endless(), CONTENT_TYPE, tmp_path / "upload.part", 10 * 1024))
+    # stopped right after the limit, not at the end of the body
+    assert len(received) <= 11
+
+
+def test_missing_file_or_not_multipart(tmp_path):
+    no_file = f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nhi\r\n--{BOUNDARY}--\r\n"
+    with pytest.raises(ValueError):
+        _receive(no_file.encode("utf-8"), tmp_path / "a.part", 1 << 20)
+    with pytest.raises(ValueError):
+        _receive(b"{}", tmp_path / "b.part", 1 << 20, content_type="application/json")
@@ -1,4 +1,5 @@
 # frontend/app.py
+import json
 import streamlit as st
 import requests
 from summarizer import render_upload_and_summary
@@ -96,25 +97,41 @@ with tab1:
             if not question.strip():
                 st.warning("Please enter a question.")
             else:
-                with st.spinner("Querying the backend..."):
-                    try:
-                        resp = requests.post(f"{API_BASE}/query", json={"question": question, "top_k": top_k}, timeout=30)
+                # answer tokens are rendered as they stream in (server-sent events)
+                st.subheader("Answer")
+                answer_box = st.empty()
+                answer, used = "", []
+                try:
+                    with requests.post(f"{API_BASE}/query/stream", json={"question": question, "top_k": top_k}, stream=True, timeout=60) as resp:
                         resp.raise_for_status()
-                        res = resp.json()
-                        st.subheader("Answer")
-                        st.write(res.get("answer", "No answer returned."))
-                        used = res.get("used_chunks", [])
-                        if used:
-                            with st.expander("Show source chunks used (for traceability)"):
-                                for u in used:
-                                    score = u.get("score", 0)
-                                    text = u.get("text", "")
-                                    st.markdown(f"- **score:** {score:.3f} — {text[:800]}{'...' if len(text) > 800 else ''}")
-                        else:
-                            st.caption("No source chunks returned.")
-                    except Exception as e:
-                        st.error("Query failed.")
-                        st.exception(e)
+                        event = None
+                        for line in resp.iter_lines(decode_unicode=True):
+                            if line.startswith("event:"):
+                                event = line[len("event:"):].strip()
+                            elif line.startswith("data:"):
+                                data = json.loads(line[len("data:"):])
+                                if event == "context":
+                                    used = data.get("used_chunks", [])
+                                    answer_box.caption("Generating answer...")
+                                elif event == "token":
+                                    answer += data.get("text", "")
+                                    answer_box.markdown(answer + " ▌")
+                                elif event in ("fallback", "done"):
+                                    # fallback replaces any partial generation with the extractive answer
+                                    answer = data.get("answer") or "No answer returned."
+                                    answer_box.markdown(answer)
+                    if used:
+                        with st.expander("Show source chunks used (for traceability)"):
+                            for u in used:
+                                score = u.get("score", 0)
+                                text = u.get("text", "")
+                                where = f" · page {u['page']}, chars {u['start_char']}–{u['end_char']}" if "page" in u else ""
+                                st.markdown(f"- **score:** {score:.3f}{where} — {text[:800]}{'...' if len(text) > 800 else ''}")
+                    else:
+                        st.caption("No source chunks returned.")
+                except Exception as e:
+                    st.error("Query failed.")
+                    st.exception(e)
 
 # ---- Quiz tab ----
 with tab2:
@@ -124,29 +141,46 @@ with tab2:
     else:
         st.markdown("Choose number of questions and generate a multiple-choice quiz. Answers are hidden — click 'Show Answer' per question.")
         n_q = st.number_input("Number of questions", min_value=1, max_value=30, value=5)
+        quiz_code = st.text_input("Quiz code (optional) — share it so everyone gets the same quiz")
         gen_btn = st.button("Generate Quiz")
 
         if gen_btn:
-            with st.spinner("Generating quiz..."):
-                try:
-                    resp = requests.post(f"{API_BASE}/quiz", json={"num_questions": int(n_q)}, timeout=60)
+            # questions arrive one per line and are previewed as they stream in;
+            # the interactive quiz below is rendered once the stream completes
+            preview = st.empty()
+            quiz = []
+            payload = {"num_questions": int(n_q)}
+            if quiz_code.strip().isdigit():
+                payload["seed"] = int(quiz_code.strip())
+            try:
+                with requests.post(f"{API_BASE}/quiz/stream", json=payload, stream=True, timeout=60) as resp:
                     resp.raise_for_status()
-                    jd = resp.json()
-                    quiz = jd.get("quiz", [])
-                    if not quiz:
-                        st.warning("No quiz items returned.")
-                    else:
-                        st.success(f"Generated {len(quiz)} questions")
-                        # store in session state for persistent selection and show-answer toggles
-                        st.session_state["current_quiz"] = quiz
-                        st.session_state["show_answer_flags"] = [False] * len(quiz)
-                except Exception as e:
-                    st.error("Failed to generate quiz.")
-                    st.exception(e)
+                    st.session_state["quiz_seed"] = resp.headers.get("X-Quiz-Seed")
+                    with preview.container():
+                        for line in resp.iter_lines():
+                            if not line:
+                                continue
+                            item = json.loads(line)
+                            quiz.append(item)
+                            st.markdown(f"**Q{len(quiz)}.** {item.get('question')}")
+                            st.caption(" · ".join(item.get("options", [])))
+                if not quiz:
+                    st.warning("No quiz items returned.")
+                else:
+                    st.success(f"Generated {len(quiz)} questions")
+                    # store in session state for persistent selection and show-answer toggles
+                    st.session_state["current_quiz"] = quiz
+                    st.session_state["show_answer_flags"] = [False] * len(quiz)
+            except Exception as e:
+                st.error("Failed to generate quiz.")
+                st.exception(e)
+            preview.empty()
 
         # display quiz if present in session_state
         quiz = st.session_state.get("current_quiz", None)
         if quiz:
+            if st.session_state.get("quiz_seed"):
+                st.caption(f"Quiz code: {st.session_state['quiz_seed']}")
             for idx, item in enumerate(quiz):
                 st.markdown(f"**Q{idx+1}.** {item.get('question')}")
                 options = item.get("options", [])
@@ -165,4 +199,4 @@ with tab2:
                         st.info(f"**Answer:** {correct}")
 
 st.markdown("---")
-st.caption("SmartCampus Assistant — Frontend (Streamlit). Backend API routes: /upload, /summary, /query, /quiz, /status")
+st.caption("SmartCampus Assistant — Frontend (Streamlit). Backend API routes: /upload, /summary, /query, /query/stream, /quiz, /quiz/stream, /status")
@@ -1,10 +1,63 @@
 # frontend/summarizer.py
+import time
 import streamlit as st
 import requests
 from io import BytesIO
 from typing import Optional, Dict, Any
 
 
+def wait_for_job(api_base: str, job_id: str, timeout: float = 600) -> Dict[str, Any]:
+    """
+    Poll /jobs/{job_id} until the ingest job finishes, showing stage progress.
+    Returns the final job record.
+    """
+    bar = st.progress(0.0, text="Queued...")
+    deadline = time.time() + timeout
+    job = {}
+    while time.time() < deadline:
+        resp = requests.get(f"{api_base}/jobs/{job_id}", timeout=10)
+        resp.raise_for_status()
+        job = resp.json()
+        if job.get("status") in ("done", "failed"):
+            break
+        stage = job.get("stage") or "queued"
+        current, total = job.get("current"), job.get("total")
+        if current and total:
+            bar.progress(min(current / total, 1.0), text=f"{stage.capitalize()} {current}/{total}")
+        elif current:
+            # streamed stages (e.g. embedding while extracting) have no known total
+            bar.progress(0.0, text=f"{stage.capitalize()} batch {current}...")
+        else:
+            bar.progress(0.0, text=f"{stage.capitalize()}...")
+        time.sleep(0.5)
+    bar.empty()
+    return job
+
+
+def check_summary(api_base: str, wait: float = 2.0) -> Dict[str, Any]:
+    """
+    Short look at /summary right after processing: polls for at most `wait` seconds,
+    so the page (and the Q&A and Quiz tabs) renders while the summary is still being
+    computed. Returns the /summary response: status "ready" with the summary,
+    "failed", or "pending" if it did not become ready within `wait`.
+    """
+    deadline = time.time() + wait
+    while True:
+        resp = requests.get(f"{api_base}/summary", timeout=10)
+        if resp.status_code == 200:
+            return resp.json()
+        if resp.status_code == 503:
+            # the backend gave up for now and retries later on its own
+            data = resp.json()
+            st.error(f"Summary failed: {data.get('error')}. It will be retried in about {data.get('retry_after')} s.")
+            return data
+        if resp.status_code != 202:
+            resp.raise_for_status()
+        if time.time() + 0.5 > deadline:
+            return resp.json()
+        time.sleep(0.5)
+
+
 def render_upload_and_summary(api_base: str) -> Optional[Dict[str, Any]]:
     """
     Renders the upload widget and summary view.
@@ -41,14 +94,35 @@ def render_upload_and_summary(api_base: str) -> Optional[Dict[str, Any]]:
                         st.code(resp.text)
                         return meta
 
+                    # processing runs as a background job on the backend
+                    job = wait_for_job(api_base, rj.get("job_id"))
+                    if job.get("status") != "done":
+                        st.error(f"Processing failed: {job.get('error') or 'timed out'}")
+                        return meta
+                    rj = job.get("result") or {}
+                    if rj.get("status") == "superseded":
+                        st.warning("A newer upload replaced this file before it finished processing.")
+                        return meta
+
                     st.success("Upload complete and processed.")
 
+                    # the summary is computed after the document is indexed; don't hold
+                    # the page for it, the button below fetches it once it is ready
+                    pending = rj.get("summary_status") == "pending"
+                    if pending:
+                        data = check_summary(api_base)
+                        rj["summary_points"] = data.get("summary")
+                        pending = data.get("status") == "pending"
+
                     # show a compact summary
                     summary_points = rj.get("summary_points") or rj.get("summary") or []
                     if summary_points:
                         st.markdown("#### Summary (point form)")
                         for i, s in enumerate(summary_points, start=1):
                             st.write(f"{i}. {s}")
+                    elif pending:
+                        st.info("The summary is still being generated — you can already ask questions. "
+                                "Use \"Fetch current summary from backend\" to see it when it's ready.")
                     else:
                         st.info("No summary returned from backend.")
 
@@ -65,7 +139,12 @@ def render_upload_and_summary(api_base: str) -> Optional[Dict[str, Any]]:
     if st.button("Fetch current summary from backend"):
         try:
             resp = requests.get(f"{api_base}/summary", timeout=10)
-            if resp.status_code == 200:
+            if resp.status_code == 202:
+                st.info("Summary is still being generated. Try again in a few seconds.")
+            elif resp.status_code == 503:
+                data = resp.json()
+                st.error(f"Summary failed: {data.get('error')}. Retry in about {data.get('retry_after')} s.")
+            elif resp.status_code == 200:
                 data = resp.json()
                 summary = data.get("summary", [])
                 if summary: